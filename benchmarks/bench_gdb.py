@@ -0,0 +1,69 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" gdb startup files for many projects, compared to rendering the template only
+
+Projects have sources, gdb exporters don't need them. Generating should take
+about as long as rendering:
+
+    python benchmarks/bench_gdb.py [projects] [sources per project]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from project_generator.project import Project
+from project_generator.settings import ProjectSettings
+from project_generator.tools.gdb import ARMNoneEABIGDB
+
+def main(projects, sources):
+    root = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        records = []
+        for i in range(projects):
+            directory = os.path.join('projects', 'project_%d' % i)
+            os.makedirs(directory)
+            for j in range(sources):
+                open(os.path.join(directory, 'source_%d.c' % j), 'w').close()
+            records.append({'common': {'sources': [directory], 'includes': [directory]}})
+        settings = ProjectSettings()
+
+        start = time.time()
+        for i, record in enumerate(records):
+            Project('project_%d' % i, [record], settings).generate('arm_none_eabi_gdb')
+        generated = time.time() - start
+
+        exporter = ARMNoneEABIGDB(None, settings)
+        start = time.time()
+        for i in range(projects):
+            exporter.gen_file_jinja('gdb.tmpl', {'gdb_server_port': 3333}, 'project_%d.gdbstartup' % i,
+                os.path.join('rendered', 'project_%d' % i))
+        rendered = time.time() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root)
+    print('%d projects, %d sources each' % (projects, sources))
+    print('generate: %.3f s' % generated)
+    print('render:   %.3f s' % rendered)
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 200][len(args):]))
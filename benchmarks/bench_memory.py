@@ -0,0 +1,115 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Memory of a uvision export with many files, groups in tuples and in a PathTable
+
+Sources are in directories of 100 files. tuples are groups as they were kept
+before the PathTable (ExportData.compact() made tuples). For each, a new
+process reports:
+
+    data KiB - export data of the resolved project, kept while it's exported
+    peak KiB - tracemalloc peak of resolving and exporting the project
+    RSS MiB  - max resident set size of the process, without tracemalloc
+
+The exporter builds its own expanded groups and the xmltodict tree of the
+project file, the peak includes them:
+
+    python benchmarks/bench_memory.py [sizes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import resource
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from project_generator.export_data import ExportData, GROUP_FIELDS
+from project_generator.project import Project
+from project_generator.settings import ProjectSettings
+from project_generator.tools_supported import ToolsSupported
+
+SIZES = [100000]
+
+def create_tree(root, size):
+    directories = []
+    for i in range(size // 100):
+        directory = os.path.join(root, 'src', 'd%d' % i)
+        os.makedirs(directory)
+        for j in range(100):
+            open(os.path.join(directory, 'vector_%d_%d.c' % (i, j)), 'w').close()
+        directories.append(directory)
+    return directories
+
+def compact_tuples(self):
+    for key in GROUP_FIELDS:
+        if key in self:
+            groups = self[key]
+            for group, files in groups.items():
+                groups[group] = tuple(files)
+
+def run(mode, root, traced):
+    """ Exports the project in this process, prints data, peak, RSS and seconds """
+    if mode == 'tuples':
+        ExportData.compact = compact_tuples
+    os.chdir(root)
+    directories = sorted([os.path.join('src', name) for name in os.listdir('src')])
+    project = Project('bench', [{'common': {'sources': {'vectors': directories},
+        'target': ['mbed-lpc1768'], 'linker_file': ['link.ld']}}], ProjectSettings())
+    if traced:
+        tracemalloc.start()
+    start = time.time()
+    project._fill_export_dict('uvision')
+    export = project.project['export']
+    # sources are resolved when they are accessed first
+    for key in GROUP_FIELDS:
+        export[key]
+    data = tracemalloc.get_traced_memory()[0] if traced else 0
+    ToolsSupported().get_tool('uvision')(export.view(), project.settings).export_project()
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    print('%d %d %d %f' % (data, peak, rss, elapsed))
+
+def measure(mode, root, traced):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--run', mode, root,
+        'traced' if traced else 'untraced'])
+    return [float(value) for value in output.split()[-4:]]
+
+def main(sizes):
+    print('%10s %8s %10s %10s %8s %10s' % ('files', 'groups', 'data KiB', 'peak KiB', 'RSS MiB', 'seconds'))
+    for size in sizes:
+        root = tempfile.mkdtemp()
+        try:
+            create_tree(root, size)
+            open(os.path.join(root, 'link.ld'), 'w').close()
+            for mode in ['tuples', 'table']:
+                data, peak, _, _ = measure(mode, root, True)
+                _, _, rss, elapsed = measure(mode, root, False)
+                print('%10d %8s %10d %10d %8.1f %10.3f' % (size, mode, data // 1024, peak // 1024,
+                    rss / 1024, elapsed))
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        run(sys.argv[2], sys.argv[3], sys.argv[4] == 'traced')
+    else:
+        main([int(size) for size in sys.argv[1:]] or SIZES)
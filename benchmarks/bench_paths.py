@@ -0,0 +1,67 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Scan time of a project with many include and source directories
+
+Each directory has a header and a source file. The time per directory should
+stay about the same as the number of directories grows:
+
+    python benchmarks/bench_paths.py [sizes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from project_generator.project import Project
+from project_generator.settings import ProjectSettings
+
+SIZES = [1000, 5000, 10000, 50000]
+
+def create_tree(root, size):
+    directories = []
+    for i in range(size):
+        directory = os.path.join(root, 'd%d' % (i // 100), 'd%d' % i)
+        os.makedirs(directory)
+        for name in ['module%d.h' % i, 'module%d.c' % i]:
+            open(os.path.join(directory, name), 'w').close()
+        directories.append(directory)
+    return directories
+
+def bench(size):
+    root = tempfile.mkdtemp()
+    try:
+        directories = create_tree(root, size)
+        project_dicts = [{'common': {'sources': directories, 'includes': directories}}]
+        project = Project('bench', project_dicts, ProjectSettings())
+        start = time.time()
+        scan = project._get_common_scan()
+        elapsed = time.time() - start
+        assert len(scan['include_paths']) == size and len(scan['source_paths']) == size
+        return elapsed
+    finally:
+        shutil.rmtree(root)
+
+def main(sizes):
+    print('%10s %10s %14s' % ('paths', 'seconds', 'us per path'))
+    for size in sizes:
+        elapsed = bench(size)
+        print('%10d %10.3f %14.1f' % (size, elapsed, elapsed * 1e6 / size))
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,85 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Peak memory of rendering a Makefile and an eclipse .project, render() and write
+compared to gen_file_jinja, which writes the output as it's rendered
+
+Peak memory is above what the data take, the data are created before:
+
+    python benchmarks/bench_render.py [sizes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from project_generator.tools.tool import Exporter
+
+SIZES = [10000, 50000, 100000]
+
+def get_data(size):
+    files = ['../../src/vectors/d%d/vector_%d.c' % (i // 100, i) for i in range(size)]
+    return {
+        'name': 'bench',
+        'source_files_c': files,
+        'source_paths': sorted(set([os.path.dirname(f) for f in files])),
+        'include_paths': ['../../include'],
+        'groups': {'vectors': [{'name': os.path.basename(f), 'path': f} for f in files]},
+        'include_files': {},
+        'misc': {},
+    }
+
+def render(exporter, template_file, data, output, dest_path):
+    """ gen_file_jinja as it was, the output string is written at once """
+    template = exporter._get_environment().get_template(template_file)
+    with open(os.path.join(dest_path, output), 'w') as f:
+        f.write(template.render(data))
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.time()
+    function(*args)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+def main(sizes):
+    exporter = Exporter()
+    root = tempfile.mkdtemp()
+    try:
+        print('%-14s %8s %8s %12s %10s' % ('template', 'files', 'mode', 'peak KiB', 'seconds'))
+        for size in sizes:
+            data = get_data(size)
+            for template_file in ['makefile_gcc.tmpl', 'eclipse.project.tmpl']:
+                # templates are loaded before
+                render(exporter, template_file, data, 'warmup', root)
+                for mode, function in [('render', render), ('stream', exporter.gen_file_jinja)]:
+                    peak, elapsed = measure(function, exporter, template_file, data, mode, root) \
+                        if mode == 'render' else measure(function, template_file, data, mode, root)
+                    print('%-14s %8d %8s %12d %10.3f' % (template_file.split('.')[0], size, mode, peak // 1024, elapsed))
+                with open(os.path.join(root, 'render'), 'rb') as f:
+                    rendered = f.read()
+                with open(os.path.join(root, 'stream'), 'rb') as f:
+                    assert f.read() == rendered
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
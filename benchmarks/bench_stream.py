@@ -0,0 +1,89 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Peak memory of resolving sources, stored lists and streamed sources
+
+Sources are in directories of 100 files. Export data is resolved and its
+groups are iterated as a makefile exporter iterates them. With streamed
+sources, the peak should stay about the same as the number of files grows,
+only the declared directories add to it. The benchmark fails if the streamed
+peak grows by more than 1% of the growth of the stored lists peak:
+
+    python benchmarks/bench_stream.py [sizes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from project_generator.project import Project
+from project_generator.settings import ProjectSettings
+from project_generator.util import SOURCE_KEYS
+
+SIZES = [10000, 50000, 100000, 200000]
+
+def create_tree(root, size):
+    directories = []
+    for i in range(size // 100):
+        directory = os.path.join(root, 'd%d' % i)
+        os.makedirs(directory)
+        for j in range(100):
+            open(os.path.join(directory, 'vector_%d_%d.c' % (i, j)), 'w').close()
+        directories.append(directory)
+    return directories
+
+def bench(directories, stream):
+    settings = ProjectSettings()
+    settings.stream_sources = stream
+    project = Project('bench', [{'common': {'sources': {'vectors': directories}}}], settings)
+    tracemalloc.start()
+    start = time.time()
+    project._fill_export_dict('make_gcc_arm')
+    export = project.project['export']
+    count = 0
+    for key in SOURCE_KEYS:
+        for files in export[key].values():
+            for path in files:
+                count += 1
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, peak, elapsed
+
+def main(sizes):
+    print('%10s %8s %12s %10s' % ('files', 'mode', 'peak KiB', 'seconds'))
+    peaks = {False: [], True: []}
+    for size in sizes:
+        root = tempfile.mkdtemp()
+        try:
+            directories = create_tree(root, size)
+            for stream in [False, True]:
+                count, peak, elapsed = bench(directories, stream)
+                assert count == size
+                peaks[stream].append(peak)
+                print('%10d %8s %12d %10.3f' % (size, 'stream' if stream else 'lists', peak // 1024, elapsed))
+        finally:
+            shutil.rmtree(root)
+    if len(sizes) > 1:
+        growth = float(peaks[True][-1] - peaks[True][0]) / (peaks[False][-1] - peaks[False][0])
+        print('streamed peak grows by %.2f%% of the lists peak growth' % (growth * 100))
+        assert growth < 0.01, 'streamed peak is not flat'
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
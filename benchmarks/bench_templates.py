@@ -0,0 +1,115 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Eclipse projects exported from the same export data, and template load times
+
+Templates are compiled once per process, the time per project is rendering.
+Load times are for a new process, compiling templates or reading them from
+the bytecode cache. Then the same in new processes, as progen starts, with
+templates from sources, from a warm bytecode cache and precompiled. Rendering
+takes the same time in each case:
+
+    python benchmarks/bench_templates.py [projects]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from project_generator.project import Project
+from project_generator.settings import ProjectSettings
+from project_generator.tools.tool import Exporter, compile_templates
+from project_generator.tools_supported import ToolsSupported
+
+TEMPLATES = ['eclipse_makefile.cproject.tmpl', 'eclipse.project.tmpl', 'makefile_gcc.tmpl',
+    'visual_studio.vcxproj.tmpl']
+
+def load_templates(bytecode_cache=None):
+    start = time.time()
+    env = Environment(loader=FileSystemLoader(Exporter.TEMPLATE_DIR), bytecode_cache=bytecode_cache)
+    for template in TEMPLATES:
+        env.get_template(template)
+    return time.time() - start
+
+# templates loaded by a new process, in ms
+FIRST_LOAD = """
+import sys, time
+from project_generator.tools.tool import Exporter, get_environment
+start = time.time()
+env = get_environment(Exporter.TEMPLATE_DIR, sys.argv[1] or None, sys.argv[2] or None)
+for template in %r:
+    env.get_template(template)
+print((time.time() - start) * 1e3)
+""" % TEMPLATES
+
+def first_load(bytecode_dir='', compiled_dir='', runs=10):
+    package = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    times = []
+    for i in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', FIRST_LOAD, bytecode_dir, compiled_dir],
+            cwd=package)
+        times.append(float(output))
+    return sorted(times)[runs // 2]
+
+def main(projects):
+    root = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        os.makedirs('src')
+        for name in ['main.c', 'uart.c', 'gpio.c', 'startup.s']:
+            open(os.path.join('src', name), 'w').close()
+        open('link.ld', 'w').close()
+        record = {'common': {'sources': ['src'], 'includes': ['src'], 'target': ['mbed-lpc1768'],
+            'linker_file': ['link.ld'], 'debugger': ['cmsis-dap']}}
+        settings = ProjectSettings()
+        project = Project('bench', [record], settings)
+        project._fill_export_dict('eclipse_make_gcc_arm')
+        export = project.project['export']
+        exporter = ToolsSupported().get_tool('eclipse_make_gcc_arm')
+
+        start = time.time()
+        for i in range(projects):
+            exporter(export.view(), settings).export_project()
+        exported = time.time() - start
+
+        compiled = load_templates()
+        bytecode_cache = FileSystemBytecodeCache(root)
+        load_templates(bytecode_cache)
+        cached = load_templates(bytecode_cache)
+
+        bytecode_dir = os.path.join(root, 'bytecode')
+        compiled_dir = os.path.join(root, 'compiled')
+        os.makedirs(compiled_dir)
+        compile_templates(Exporter.TEMPLATE_DIR, compiled_dir)
+        first_load(bytecode_dir, runs=1)
+        first = [first_load(), first_load(bytecode_dir), first_load(compiled_dir=compiled_dir)]
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root)
+    print('%d eclipse projects: %.3f s, %.2f ms per project' % (projects, exported, exported * 1e3 / projects))
+    print('template load, compiled: %.1f ms' % (compiled * 1e3))
+    print('template load, bytecode cache: %.1f ms' % (cached * 1e3))
+    print('template load in a new process (median), sources: %.1f ms, bytecode cache: %.1f ms, precompiled: %.1f ms' %
+        tuple(first))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
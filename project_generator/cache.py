@@ -0,0 +1,213 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import marshal
+import hashlib
+import logging
+import threading
+
+from contextlib import contextmanager
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .util import load_yaml
+
+logger = logging.getLogger('progen.cache')
+
+
+def _file_stamp(stat):
+    """ mtime with the best resolution available + size """
+    return getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size
+
+@contextmanager
+def open_atomic(path, mode='wb'):
+    """ Open a file for writing, it replaces path only if the block succeeds
+
+    The file is written next to path and renamed, readers never see a partially
+    written file and an exception leaves path as it was. A replaced file keeps
+    its permissions.
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # created meanwhile by another process
+            pass
+    tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.current_thread().ident)
+    f = open(tmp_path, mode)
+    try:
+        with f:
+            yield f
+        try:
+            shutil.copymode(path, tmp_path)
+        except (IOError, OSError):
+            # a new file
+            pass
+        try:
+            os.replace(tmp_path, path)
+        except AttributeError:
+            # python 2 does not have replace, rename fails on windows if the file exists
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write_atomic(path, data):
+    """ Write bytes to a file, readers never see a partially written file """
+    with open_atomic(path) as f:
+        f.write(data)
+
+def dump_data(data):
+    """ Serialize data for a file in the cache directory
+
+    Only builtin types (dict, list, tuple, str, int, ...) are supported, others
+    raise ValueError. Files are marshalled, not pickled: loading them only
+    builds values, nothing is called, even if somebody else wrote the file.
+    """
+    return marshal.dumps({'marshal': marshal.version, 'data': data})
+
+def load_data(blob):
+    """ Data serialized by dump_data, raises ValueError if it's not valid """
+    try:
+        value = marshal.loads(blob)
+    except (EOFError, TypeError):
+        raise ValueError("Invalid cache data")
+    if type(value) is not dict or value.get('marshal') != marshal.version:
+        raise ValueError("Invalid cache data")
+    return value['data']
+
+class RecordCache:
+    """ Persistent cache of parsed yaml records
+
+    Parsed records are stored in the cache directory (dump_data), one entry per
+    record file.
+    An entry is valid if the record file's mtime and size did not change. If they did,
+    the content digest is compared before parsing, so a touched but unchanged file
+    is still served from the cache.
+
+    Each record is read at most once per instance, it is kept in memory afterwards.
+    Every caller gets its own copy of the record, projects can modify what they
+    get without affecting other projects sharing the same record.
+
+    Records can be loaded from multiple threads. Records with values marshal
+    does not support (yaml timestamps) are not stored in the cache directory.
+    """
+
+    VERSION = 3
+
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = os.path.join(cache_dir, 'records')
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.memo_hits = 0
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = load_data(f.read())
+        except (IOError, OSError):
+            return None
+        except Exception:
+            # a corrupted entry is just a miss, it gets rewritten
+            logger.debug("Invalid cache entry %s" % entry_path)
+            return None
+        if type(entry) is not dict or entry.get('version') != self.VERSION:
+            return None
+        return entry
+
+    def _write_entry(self, entry_path, entry):
+        try:
+            write_atomic(entry_path, dump_data(entry))
+        except (IOError, OSError):
+            logger.debug("Can't write cache entry %s" % entry_path)
+
+    @staticmethod
+    def _dumps(record):
+        """ (loads, blob) of a record, other objects than marshal supports are pickled """
+        try:
+            return marshal.loads, marshal.dumps(record)
+        except ValueError:
+            return pickle.loads, pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+
+    def _load_blob(self, path):
+        """ Returns (loads, blob) of a record, from the cache directory if valid """
+        if not self.enabled:
+            self._count('misses')
+            with open(path, 'rt') as f:
+                return self._dumps(load_yaml(f))
+
+        stamp = _file_stamp(os.stat(path))
+        entry_path = self._entry_path(path)
+        entry = self._read_entry(entry_path)
+        if entry and entry['stamp'] == stamp:
+            self._count('hits')
+            return marshal.loads, entry['blob']
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if entry and entry['digest'] == digest:
+            self._count('hits')
+        else:
+            self._count('misses')
+            loads, blob = self._dumps(load_yaml(content))
+            if loads is not marshal.loads:
+                # pickled records are only kept in memory
+                return loads, blob
+            entry = {
+                'version': self.VERSION,
+                'digest': digest,
+                'blob': blob,
+            }
+        entry['stamp'] = stamp
+        self._write_entry(entry_path, entry)
+        return marshal.loads, entry['blob']
+
+    def load(self, path):
+        """ Returns parsed yaml record, raises IOError if the file does not exist """
+        key = os.path.abspath(path)
+        try:
+            loads, blob = self._memo[key]
+            self._count('memo_hits')
+        except KeyError:
+            loads, blob = self._memo[key] = self._load_blob(path)
+        return loads(blob)
+
+    def clear(self):
+        """ Remove all cached entries """
+        if os.path.isdir(self.cache_dir):
+            for entry in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, entry))
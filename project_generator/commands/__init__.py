@@ -26,3 +26,13 @@ def argparse_string_type(case_converter, prefer_hyphen=False):
         return lambda string: case_converter(string).replace("_","-")
     else:
         return lambda string: case_converter(string).replace("-","_")
+
+def argparse_shard_type(string):
+    """ Shard i of n, given as i/n, i starts at 1 """
+    try:
+        index, count = [int(x) for x in string.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%s is not a shard, use i/n, for example 1/4." % string)
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("Shard %s is out of range." % string)
+    return index, count
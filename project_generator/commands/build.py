@@ -17,7 +17,7 @@ import logging
 from ..tools_supported import ToolsSupported
 from ..generate import Generator
 from ..settings import ProjectSettings
-from . import argparse_filestring_type, argparse_string_type
+from . import argparse_filestring_type, argparse_string_type, argparse_shard_type
 
 help = 'Build a project'
 
@@ -27,7 +27,7 @@ def run(args):
     generator = Generator(args.file)
     build_failed = False
     export_failed = False
-    for project in generator.generate(args.project):
+    for project in generator.generate(args.project, args.shard, generator.shard_costs(args.shard_costs)):
         if project.generate(args.tool, args.copy) == -1:
             export_failed = True
         if project.build(args.tool) == -1:
@@ -49,3 +49,8 @@ def setup(subparser):
         type=argparse_string_type(str.lower, False), choices=list(ToolsSupported.TOOLS_DICT.keys()) + list(ToolsSupported.TOOLS_ALIAS.keys()))
     subparser.add_argument(
         "-c", "--copy", action="store_true", help="Copy all files to the exported directory")
+    subparser.add_argument(
+        "--shard", type=argparse_shard_type, help="Process only shard i of n (i/n), projects are balanced by --shard-costs or assigned by a hash of their names")
+    subparser.add_argument(
+        "--shard-costs", type=argparse_filestring_type,
+        help="YAML file with costs of projects for --shard, the same for all shards (see --save-shard-costs)")
@@ -16,20 +16,38 @@ import logging
 
 from ..tools_supported import ToolsSupported
 from ..generate import Generator
-from . import argparse_filestring_type, argparse_string_type
+from . import argparse_filestring_type, argparse_string_type, argparse_shard_type
 
 help = 'Clean generated projects'
 
 
 def run(args):
     generator = Generator(args.file)
-    for project in generator.generate(args.project):
-        project.clean(args.tool)
+    if args.shard and not args.project:
+        # projects of the shard, cleaning a workspace is not supported
+        selected = generator.index.shard(args.shard, generator.shard_costs(args.shard_costs))
+        for project in generator.index.projects:
+            if project in selected:
+                generator.load_project(project).clean(args.tool)
+    elif not args.project:
+        logging.error("Specify a project or a shard to be removed.")
+        return -1
+    elif args.project in generator.index.projects:
+        generator.load_project(args.project).clean(args.tool)
+    elif args.project in generator.index.workspaces:
+        # workspace members are not loaded, cleaning a workspace is not supported
+        logging.info("Cleaning a workspace is not currently supported")
+    else:
+        logging.error("You specified an invalid project name.")
     return 0
 
 def setup(subparser):
     subparser.add_argument("-f", "--file", help="YAML projects file", default='projects.yaml', type=argparse_filestring_type)
-    subparser.add_argument("-p", "--project", required = True, help="Specify which project to be removed")
+    subparser.add_argument("-p", "--project", default = '', help="Specify which project to be removed")
     subparser.add_argument(
         "-t", "--tool", help="Clean project files for this tool",
         type=argparse_string_type(str.lower, False), choices=list(ToolsSupported.TOOLS_DICT.keys()) + list(ToolsSupported.TOOLS_ALIAS.keys()))
+    subparser.add_argument(
+        "--shard", type=argparse_shard_type, help="Remove projects of shard i of n (i/n) instead of one project")
+    subparser.add_argument(
+        "--shard-costs", type=argparse_filestring_type, help="YAML file with costs of projects for --shard")
@@ -16,30 +16,103 @@ import logging
 
 from ..tools_supported import ToolsSupported
 from ..generate import Generator
-from . import argparse_filestring_type, argparse_string_type
+from ..manifest import Manifest
+from ..lock import ProjectLock
+from . import argparse_filestring_type, argparse_string_type, argparse_shard_type
 
 help = 'Generate a project record'
 
+logger = logging.getLogger('progen.commands.generate')
+
+def _report(manifest):
+    skipped, generated, reasons = manifest.summary()
+    logger.info("%d project(s) generated, %d skipped (%s)" % (generated, skipped,
+        ', '.join(['%s: %d' % (reason, count) for reason, count in sorted(reasons.items())]) or 'none'))
+
+def _build(results, settings):
+    """ Builds projects generated from a lock """
+    build_failed = False
+    for result in results:
+        if not result.failed and result.files is not None:
+            if ToolsSupported().get_tool(result.tool)(result.files, settings).build_project() == -1:
+                build_failed = True
+    return build_failed
+
+def _run_from_lock(args):
+    if args.copy or args.shard or args.save_shard_costs:
+        logger.error("Copying sources and shards are not supported with a lock file.")
+        return -1
+    lock = ProjectLock.load(args.from_lock)
+    names = None
+    if args.project:
+        if args.project not in lock.projects():
+            logger.error("You specified an invalid project name.")
+            return -1
+        names = [args.project]
+    manifest = None
+    if lock.settings.cache:
+        manifest = Manifest(lock.settings.cache_dir, args.force)
+
+    results = lock.export_many(names, [args.tool] if args.tool else None, manifest)
+    if manifest:
+        manifest.save()
+        _report(manifest)
+    export_failed = len([result for result in results if result.failed]) > 0
+    build_failed = args.build and _build(results, lock.settings)
+    if build_failed or export_failed or not results:
+        return -1
+    else:
+        return 0
+
 def run(args):
+    if args.from_lock:
+        return _run_from_lock(args)
+    # -f is not needed with a lock, the default is checked only here
+    if args.file is None:
+        args.file = 'projects.yaml'
+        if not os.path.exists(args.file):
+            logger.error("%s is not a file." % args.file)
+            return -1
     generator = Generator(args.file)
+    manifest = None
+    if generator.settings.cache:
+        manifest = Manifest(generator.settings.cache_dir, args.force)
+    selected = generator.select(args.project, args.shard, generator.shard_costs(args.shard_costs))
+    if selected is None:
+        logger.error("You specified an invalid project name.")
+        return -1
+    projects, workspaces = selected
+
+    results = generator.export_many(projects + workspaces, [args.tool] if args.tool else None,
+        args.jobs, copied=args.copy, copy=args.copy, manifest=manifest)
+    if manifest:
+        manifest.save()
+        _report(manifest)
+        if args.save_shard_costs:
+            generator.save_shard_costs(args.save_shard_costs)
+    export_failed = len([result for result in results if result.failed]) > 0
+
     build_failed = False
-    export_failed = False
-    generated = True
-    for project in generator.generate(args.project):
-        generated = False
-        if project.generate(args.tool, copied=args.copy, copy=args.copy) == -1:
-            export_failed = True
-        if args.build:
+    if args.build:
+        for name in projects:
+            project = generator.load_project(name)
+            project.generated_files = dict([(result.tool, result.files) for result in results
+                if result.name == name and not result.workspace and result.files is not None])
             if project.build(args.tool) == -1:
                 build_failed = True
-    if build_failed or export_failed or generated:
+        if workspaces:
+            logger.info("Building a workspace is not currently supported")
+            build_failed = True
+
+    # a shard might be empty
+    if build_failed or export_failed or (not projects and not workspaces and not args.shard):
         return -1
     else:
         return 0
 
 def setup(subparser):
     subparser.add_argument(
-        "-f", "--file", help="YAML projects file", default='projects.yaml', type=argparse_filestring_type)
+        "-f", "--file", help="YAML projects file (default: projects.yaml)", type=argparse_filestring_type)
     subparser.add_argument(
         "-p", "--project", help="Project to be generated", default = '')
     subparser.add_argument(
@@ -49,3 +122,16 @@ def setup(subparser):
         "-b", "--build", action="store_true", help="Build defined projects")
     subparser.add_argument(
         "-c", "--copy", action="store_true", help="Copy all files to the exported directory")
+    subparser.add_argument(
+        "--force", action="store_true", help="Generate projects even if their inputs did not change")
+    subparser.add_argument(
+        "--shard", type=argparse_shard_type, help="Process only shard i of n (i/n), projects are balanced by --shard-costs or assigned by a hash of their names")
+    subparser.add_argument(
+        "--shard-costs", type=argparse_filestring_type,
+        help="YAML file with costs of projects for --shard, the same for all shards (see --save-shard-costs)")
+    subparser.add_argument(
+        "--save-shard-costs", help="Write costs of projects generated so far to a file for --shard-costs")
+    subparser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of processes generating projects in parallel")
+    subparser.add_argument(
+        "--from-lock", help="Generate projects resolved by progen resolve to the lock file, records are not read")
@@ -26,11 +26,14 @@ help = 'List general progen data as projects, tools or targets'
 def run(args):
     if args.file and os.path.exists(args.file):
         generator = Generator(args.file)
+        if args.section == 'projects':
+            # names are known without loading any record
+            for name in generator.index.projects + generator.index.workspaces:
+                print (name)
+            return 0
         for project in generator.generate():
             if args.section == 'targets':
                 print("%s supports: %s"%(project.project['name'], project.project['target']))
-            elif args.section == 'projects':
-                print (project.name)
             elif args.section == 'tools':
                 tools = [tool for tool, value in project.tool_specific.items() if value.linker_file is not None]
                 tools = ", ".join(tools)
@@ -0,0 +1,49 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+
+from ..tools_supported import ToolsSupported
+from ..generate import Generator
+from ..lock import ProjectLock
+from . import argparse_filestring_type, argparse_string_type
+
+help = 'Resolve projects to a lock file, generate --from-lock uses it'
+
+logger = logging.getLogger('progen.commands.resolve')
+
+def run(args):
+    generator = Generator(args.file)
+    names = None
+    if args.project:
+        if args.project not in generator.index.projects:
+            logger.error("You specified an invalid project name.")
+            return -1
+        names = [args.project]
+    resolved = generator.resolve(names, [args.tool] if args.tool else None, args.copy)
+    ProjectLock(generator.settings, resolved).save(args.output)
+    logger.info("%d project(s) resolved to %s" % (len(resolved), args.output))
+    return 0
+
+def setup(subparser):
+    subparser.add_argument(
+        "-f", "--file", help="YAML projects file", default='projects.yaml', type=argparse_filestring_type)
+    subparser.add_argument(
+        "-p", "--project", help="Project to be resolved", default = '')
+    subparser.add_argument(
+        "-t", "--tool", help="Resolve projects for provided tool",
+        type=argparse_string_type(str.lower, False), choices=list(ToolsSupported.TOOLS_DICT.keys()) + list(ToolsSupported.TOOLS_ALIAS.keys()))
+    subparser.add_argument(
+        "-c", "--copy", action="store_true", help="Resolve for sources copied to the exported directory")
+    subparser.add_argument(
+        "-o", "--output", help="Lock file", default='projects.lock')
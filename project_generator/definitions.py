@@ -0,0 +1,61 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+
+from project_generator_definitions.definitions import ProGenDef
+
+# one instance per tool, shared by all exporters in a process
+_definitions = {}
+
+class ProGenDefCache(object):
+    """ ProGenDef which reads each target record once
+
+    ProGenDef reads target records on every query. The answers are kept here,
+    callers get their own copy.
+    """
+
+    def __init__(self, tool=None):
+        self.definitions = ProGenDef(tool)
+        self._memo = {}
+
+    def _get(self, query, target):
+        try:
+            result = self._memo[(query, target)]
+        except KeyError:
+            result = self._memo[(query, target)] = getattr(self.definitions, query)(target)
+        return copy.deepcopy(result)
+
+    def get_targets(self):
+        return self.definitions.get_targets()
+
+    def get_mcu_core(self, target):
+        return self._get('get_mcu_core', target)
+
+    def get_tool_definition(self, target):
+        return self._get('get_tool_definition', target)
+
+    def is_supported(self, target):
+        return self._get('is_supported', target)
+
+    def get_debugger(self, target):
+        return self._get('get_debugger', target)
+
+def get_definitions(tool=None):
+    """ Target definitions for a tool, None for generic definitions """
+    try:
+        return _definitions[tool]
+    except KeyError:
+        definitions = _definitions[tool] = ProGenDefCache(tool)
+        return definitions
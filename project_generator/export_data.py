@@ -0,0 +1,253 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from .util import SOURCE_KEYS
+from .paths import PathTable, PathView, PathStream
+
+# fields with dicts of groups to lists of files
+GROUP_FIELDS = tuple(SOURCE_KEYS) + ('include_files', 'file_groups')
+
+# fields which are resolved by scanning sources and includes
+FILE_FIELDS = GROUP_FIELDS + ('source_paths', 'include_paths')
+
+# a key deleted in a view
+_DELETED = object()
+
+# lazy fields are loaded by one thread at a time, _loading are loaders running
+_load_lock = threading.RLock()
+_loading = []
+
+class ExportData(MutableMapping):
+    """ Export data of a project for a tool, see get_tool_template
+
+    Fields of the tool template and of the project template are slots, keys
+    exporters add for their templates are kept in extras. It behaves as a dict,
+    exporters and templates use it as they used the export dict.
+
+    Once the project is resolved, files of groups are PathView sequences, they
+    support list operations. Exporters get an ExportView of the data (view()),
+    it is not modified by them.
+
+    Fields can be lazy (set_lazy()), they are computed when they are accessed
+    first. Exporters which don't need sources don't wait for directory scans.
+    """
+
+    FIELDS = (
+        # tool template
+        'source_paths', 'include_paths', 'include_files', 'source_files_c', 'source_files_cpp',
+        'source_files_s', 'source_files_obj', 'source_files_lib', 'singular', 'output_dir',
+        'macros', 'template', 'misc', 'file_groups',
+        # project template
+        'build_dir', 'debugger', 'export_dir', 'name', 'output_type', 'target',
+        'tools_supported', 'includes', 'linker_file', 'sources',
+    )
+
+    __slots__ = FIELDS + ('extras', '_lazy')
+
+    def __init__(self, data=None):
+        self.extras = {}
+        self._lazy = {}
+        if data:
+            self.update(data)
+
+    def __getitem__(self, key):
+        if self._lazy and key in self._lazy:
+            self._load(key)
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        return self.extras[key]
+
+    def __setitem__(self, key, value):
+        if self._lazy and key in self._lazy:
+            self._load(key)
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extras[key] = value
+
+    def __delitem__(self, key):
+        if self._lazy and key in self._lazy:
+            self._load(key)
+        if key in self.FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        else:
+            del self.extras[key]
+
+    def __contains__(self, key):
+        if key in self._lazy:
+            return True
+        if key in self.FIELDS:
+            return hasattr(self, key)
+        return key in self.extras
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key) or key in self._lazy:
+                yield key
+        for key in self.extras:
+            yield key
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return 'ExportData(%r)' % self.as_dict()
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        self.extras = {}
+        self._lazy = {}
+        self.update(state)
+
+    def set_lazy(self, keys, loader):
+        """ loader(data) sets the keys, it's called when one of them is accessed first
+
+        The keys keep their current values until then, the loader can use them.
+        Keys are in the data before they are loaded.
+        """
+        for key in keys:
+            self._lazy[key] = loader
+
+    def is_loaded(self, key):
+        return key not in self._lazy
+
+    def _load(self, key):
+        with _load_lock:
+            loader = self._lazy.get(key)
+            # the loader accesses the keys itself
+            if loader is None or loader in _loading:
+                return
+            _loading.append(loader)
+            try:
+                loader(self)
+            finally:
+                _loading.remove(loader)
+            for lazy_key in [k for k, v in self._lazy.items() if v is loader]:
+                del self._lazy[lazy_key]
+
+    def copy(self):
+        """ Shallow copy, as dict.copy """
+        return ExportData(self)
+
+    def view(self):
+        """ Copy-on-write view for an exporter """
+        return ExportView(self)
+
+    def compact(self):
+        """ Files of groups become views of a PathTable, directories are stored once
+
+        Streamed files (PathStream) are not stored, they stay streams.
+        """
+        table = PathTable()
+        for key in GROUP_FIELDS:
+            if key in self:
+                groups = self[key]
+                for group, files in groups.items():
+                    if not isinstance(files, PathStream):
+                        groups[group] = table.view(files)
+        table.seal()
+
+    def as_dict(self):
+        """ Plain dicts and lists, for yaml dumps """
+        def plain(value):
+            if isinstance(value, dict):
+                return dict([(k, plain(v)) for k, v in value.items()])
+            elif isinstance(value, (list, tuple, PathView, PathStream)):
+                return [plain(v) for v in value]
+            return value
+        return dict([(key, plain(value)) for key, value in self.items()])
+
+class ExportView(MutableMapping):
+    """ Copy-on-write view of export data
+
+    Keys set or deleted in the view are kept in its overlay, the data below are
+    not changed. Values are read from the data below as they are, they are shared
+    with other views and must not be modified in place. An exporter replaces a
+    value instead (view['output_dir'] = dict(view['output_dir'], rel_path='')).
+    Files of groups are the exception, a view gets its own dicts of groups with
+    PathView copies, they can be modified as lists, the paths are not copied.
+    Many views of the same data can be used at once, also by different threads.
+    copy() is a view of the view.
+    """
+
+    __slots__ = ('base', 'overlay', 'accessed')
+
+    def __init__(self, base):
+        self.base = base
+        self.overlay = {}
+        # keys read from the data below, inputs of the exporter
+        self.accessed = set()
+
+    def __getitem__(self, key):
+        try:
+            value = self.overlay[key]
+        except KeyError:
+            self.accessed.add(key)
+            value = self.base[key]
+            if key in GROUP_FIELDS and isinstance(value, dict):
+                value = self.overlay[key] = value.__class__([(group, files.copy() if isinstance(files, PathView)
+                    else files) for group, files in value.items()])
+            return value
+        if value is _DELETED:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.overlay[key] = _DELETED
+
+    def __contains__(self, key):
+        if key in self.overlay:
+            return self.overlay[key] is not _DELETED
+        self.accessed.add(key)
+        return key in self.base
+
+    def __iter__(self):
+        for key in self.base:
+            if self.overlay.get(key) is not _DELETED:
+                yield key
+        for key, value in self.overlay.items():
+            if value is not _DELETED and key not in self.base:
+                yield key
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        changed = dict([(k, v) for k, v in self.overlay.items() if v is not _DELETED])
+        deleted = [k for k, v in self.overlay.items() if v is _DELETED]
+        return 'ExportView(%r, changed=%r, deleted=%r)' % (self.base, changed, deleted)
+
+    def copy(self):
+        """ View of this view, as dict.copy it does not change this view """
+        return ExportView(self)
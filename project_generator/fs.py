@@ -0,0 +1,284 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import logging
+from multiprocessing.pool import ThreadPool
+
+try:
+    from os import scandir
+except ImportError:
+    # python 2, scandir package if available
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+from .cache import write_atomic, dump_data, load_data
+
+logger = logging.getLogger('progen.fs')
+
+def list_directory(path):
+    """ (name, is_dir, is_file, is_link) for entries of a directory, it's not cached """
+    entries = []
+    if scandir is not None:
+        for entry in scandir(path):
+            entries.append((entry.name, entry.is_dir(), entry.is_file(), entry.is_symlink()))
+    else:
+        for name in os.listdir(path):
+            full_path = os.path.join(path, name)
+            entries.append((name, os.path.isdir(full_path), os.path.isfile(full_path),
+                os.path.islink(full_path)))
+    return entries
+
+class FileSystemSnapshot(object):
+    """ Cached directory listings and entry types
+
+    A directory is listed once, types of its entries come with the listing. Paths
+    which are not in a listed directory are stat'ed once. The snapshot does not see
+    changes made afterwards, call invalidate() for paths which were modified.
+
+    The counters tell how much work was done: listings - directories listed,
+    stats - paths stat'ed, hits - answers from the snapshot, index_hits - listings
+    from the index.
+
+    With index_path, listings are kept in a file between runs. A directory is not
+    listed again while its mtime is the same, it's just stat'ed. Entries come from
+    the index then, a file replaced by a directory (or the other way) changes the
+    mtime of the directory, a symlink target does not.
+    """
+
+    # directories modified less than this many seconds before they were listed
+    # are not stored in the index, the same mtime might hide a later change
+    RACY_SECONDS = 2
+    INDEX_VERSION = 2
+
+    def __init__(self, index_path=None):
+        # abspath -> list of (name, is_dir, is_file, is_link), None if it can't be listed
+        self._listings = {}
+        # abspath -> name -> entry, for each listing
+        self._entries = {}
+        # abspath -> (is_dir, is_file) for paths outside listed directories
+        self._types = {}
+        # abspath -> lower case names of a listing, see _type
+        self._folded = {}
+        self.listings = 0
+        self.stats = 0
+        self.hits = 0
+        self.index_hits = 0
+
+        # persistent index, abspath -> (mtime, listing), valid while directory mtime is the same
+        self.index_path = index_path
+        self._index = {}
+        self._index_updates = {}
+        if index_path:
+            try:
+                with open(index_path, 'rb') as f:
+                    index = load_data(f.read())
+                if index['version'] == self.INDEX_VERSION:
+                    self._index = index['directories']
+            except (IOError, OSError):
+                pass
+            except Exception:
+                logger.debug("Invalid file system index %s" % index_path)
+
+    def _list(self, path):
+        return list_directory(path)
+
+    def _read_listing(self, key):
+        """ Returns (listing or None, mtime, from index), does not modify the snapshot """
+        if not self.index_path:
+            try:
+                return self._list(key), None, False
+            except OSError:
+                return None, None, False
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None, None, False
+        mtime = getattr(stat, 'st_mtime_ns', stat.st_mtime)
+        indexed = self._index.get(key)
+        if indexed is not None and indexed[0] == mtime:
+            return indexed[1], mtime, True
+        try:
+            entries = self._list(key)
+        except OSError:
+            return None, None, False
+        if time.time() - stat.st_mtime < self.RACY_SECONDS:
+            mtime = None
+        return entries, mtime, False
+
+    def _add_listing(self, key, entries, mtime, indexed):
+        if indexed:
+            self.stats += 1
+            self.index_hits += 1
+        else:
+            self.listings += 1
+            if mtime is not None and entries is not None:
+                self._index_updates[key] = (mtime, entries)
+        self._listings[key] = entries
+        if entries is not None:
+            self._entries[key] = dict([(entry[0], entry) for entry in entries])
+
+    def _listing(self, path):
+        key = os.path.abspath(path)
+        try:
+            entries = self._listings[key]
+            self.hits += 1
+        except KeyError:
+            entries, mtime, indexed = self._read_listing(key)
+            self._add_listing(key, entries, mtime, indexed)
+        if entries is None:
+            raise OSError("The directory %s can't be listed." % path)
+        return entries
+
+    def _type(self, path):
+        key = os.path.abspath(path)
+        parent, name = os.path.split(key)
+        if parent in self._entries:
+            entry = self._entries[parent].get(name)
+            if entry is not None:
+                self.hits += 1
+                return entry[1], entry[2]
+            if name.lower() not in self._folded_names(parent):
+                self.hits += 1
+                return False, False
+            # it differs only in case from a listed name (Src/ listed as src/), it's
+            # the same entry on a case insensitive file system, stat tells
+        try:
+            result = self._types[key]
+            self.hits += 1
+        except KeyError:
+            self.stats += 1
+            result = self._types[key] = os.path.isdir(key), os.path.isfile(key)
+        return result
+
+    def _folded_names(self, key):
+        """ Lower case names of a listing, made when a name is not found first """
+        try:
+            return self._folded[key]
+        except KeyError:
+            names = self._folded[key] = set([name.lower() for name in self._entries[key]])
+            return names
+
+    def _probe(self, key):
+        """ Listing of a path, or its type if it's not a directory. Runs in a pool thread """
+        entries, mtime, indexed = self._read_listing(key)
+        if entries is None:
+            return key, (entries, mtime, indexed), (os.path.isdir(key), os.path.isfile(key))
+        return key, (entries, mtime, indexed), None
+
+    def prefetch(self, paths, jobs):
+        """ Lists directories in paths concurrently, with jobs threads
+
+        The snapshot is updated by the calling thread in the order of paths, answers
+        are the same as without prefetching.
+        """
+        keys = []
+        for path in paths:
+            key = os.path.abspath(path)
+            if key not in self._listings and key not in self._types and key not in keys:
+                keys.append(key)
+        if not keys:
+            return
+        pool = ThreadPool(min(jobs, len(keys)))
+        try:
+            probed = pool.map(self._probe, keys)
+        finally:
+            pool.close()
+            pool.join()
+        for key, listing, types in probed:
+            if types is None:
+                self._add_listing(key, *listing)
+                self._types[key] = (True, False)
+            else:
+                # not a directory, the listing attempt stat'ed it
+                self.stats += 1
+                self._types[key] = types
+
+    def isdir(self, path):
+        return self._type(path)[0]
+
+    def isfile(self, path):
+        return self._type(path)[1]
+
+    def exists(self, path):
+        return self._type(path) != (False, False)
+
+    def listdir(self, path):
+        """ Names in a directory, in the order os.listdir returns them """
+        return [entry[0] for entry in self._listing(path)]
+
+    def files(self, path):
+        """ Names of files in a directory """
+        return [entry[0] for entry in self._listing(path) if entry[2]]
+
+    def walk(self, top):
+        """ os.walk, top-down, errors are ignored """
+        try:
+            entries = self._listing(top)
+        except OSError:
+            return
+        dirs = [entry[0] for entry in entries if entry[1]]
+        yield top, dirs, [entry[0] for entry in entries if not entry[1]]
+        # links to directories are not followed
+        links = [entry[0] for entry in entries if entry[1] and entry[3]]
+        for name in dirs:
+            if name not in links:
+                for walked in self.walk(os.path.join(top, name)):
+                    yield walked
+
+    def invalidate(self, path=None):
+        """ Forget a path and everything below it, everything if path is None """
+        if path is None:
+            self._listings = {}
+            self._entries = {}
+            self._types = {}
+            self._folded = {}
+            self._index = {}
+            self._index_updates = {}
+            return
+        key = os.path.abspath(path)
+        prefix = key.rstrip(os.sep) + os.sep
+        parent = os.path.dirname(key)
+        for cache in [self._listings, self._entries, self._types, self._folded, self._index, self._index_updates]:
+            for cached in [cached for cached in cache if cached == key or cached.startswith(prefix)]:
+                del cache[cached]
+        # the parent listing has the path's type
+        for cache in [self._listings, self._entries, self._folded, self._index, self._index_updates]:
+            cache.pop(parent, None)
+
+    def take_index_updates(self):
+        """ Listings for the index since the last call, for a snapshot of another process """
+        updates, self._index_updates = self._index_updates, {}
+        self._index.update(updates)
+        return updates
+
+    def merge_index_updates(self, updates):
+        """ Listings of another process (take_index_updates), save() stores them """
+        if self.index_path:
+            self._index_updates.update(updates)
+
+    def save(self):
+        """ Stores listings in the index, directories listed by this run are updated """
+        if not self.index_path or not self._index_updates:
+            return
+        self._index.update(self._index_updates)
+        self._index_updates = {}
+        try:
+            write_atomic(self.index_path, dump_data({'version': self.INDEX_VERSION,
+                'directories': self._index}))
+        except (IOError, OSError):
+            logger.debug("Can't write file system index %s" % self.index_path)
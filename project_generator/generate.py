@@ -11,63 +11,343 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import yaml
+import os
+import zlib
+import time
+import logging
+import traceback
 
 from .settings import ProjectSettings
-from .util import flatten, uniqify, load_yaml_records
+from .tools_supported import ToolsSupported
+from .cache import RecordCache
+from .fs import FileSystemSnapshot
+from .manifest import Manifest
+from .util import flatten, uniqify, load_yaml, load_yaml_records, dump_yaml
 from .project import *
+from .parallel import export_parallel
+
+logger = logging.getLogger('progen.generate')
+
+class ExportResult(object):
+    """ Result of generating a project or a workspace for a tool
+
+    result - 0 or -1 as returned by generate
+    files - generated files, the content depends on the tool (see generated_files)
+    error - message if generating raised an exception, traceback is logged
+    time - seconds spent generating
+    """
+
+    def __init__(self, name, tool, workspace=False):
+        self.name = name
+        self.tool = tool
+        self.workspace = workspace
+        self.result = 0
+        self.files = None
+        self.error = None
+        self.time = 0.0
+
+    @property
+    def failed(self):
+        return self.result == -1 or self.error is not None
+
+    def __repr__(self):
+        return '<ExportResult %s %s %s>' % (self.name, self.tool, 'failed' if self.failed else 'ok')
+
+class ProjectIndex:
+    """ Names, records and workspaces defined in the projects file
+
+    Nothing is loaded here, records are just listed. Use Generator to load
+    a project or a workspace.
+    """
+
+    def __init__(self, projects_dict):
+        self._projects = projects_dict.get('projects') or {}
+        self._workspaces = projects_dict.get('workspaces') or {}
+        self._membership = None
+        self.projects = sorted(self._projects.keys())
+        self.workspaces = sorted(self._workspaces.keys())
+
+    def records(self, name):
+        """ Record files of a project, in the order they are merged """
+        return uniqify(flatten(self._projects[name]))
+
+    def workspace_projects(self, name):
+        return self._workspaces[name]['projects']
+
+    def workspace_settings(self, name):
+        return self._workspaces[name].get('settings', {})
+
+    def workspaces_of(self, name):
+        """ Workspaces a project is a member of """
+        if self._membership is None:
+            self._membership = {}
+            for workspace in self.workspaces:
+                for project in self.workspace_projects(workspace):
+                    self._membership.setdefault(project, []).append(workspace)
+        return self._membership.get(name, [])
+
+    def workspace_groups(self, workspaces):
+        """ Workspaces which share a project, they generate the same files """
+        groups = []
+        for workspace in workspaces:
+            members = set(self.workspace_projects(workspace))
+            names = [workspace]
+            for group in [group for group in groups if group[1] & members]:
+                groups.remove(group)
+                names = group[0] + names
+                members |= group[1]
+            groups.append((names, members))
+        return [sorted(names, key=workspaces.index) for names, members in groups]
+
+    def shard(self, shard, costs=None):
+        """ Projects and workspaces of a shard, shard is (i, n), i starts at 1
+
+        Without costs, a name is in the shard given by a hash of the name, it does
+        not depend on anything else.
+
+        With costs, the most expensive are assigned first, each to the least loaded
+        shard. costs maps projects to their estimated cost, unknown projects cost the
+        mean of known ones. A workspace costs as much as its members. The assignment
+        depends only on the projects file and costs, all shards must use the same
+        costs, see Generator.shard_costs.
+        """
+        index, count = shard
+        if not costs:
+            return set([name for name in self.projects + self.workspaces
+                if (zlib.crc32(name.encode('utf-8')) & 0xffffffff) % count == index - 1])
+        known = [costs[project] for project in self.projects if project in costs]
+        default = float(sum(known)) / len(known) if known else 1
+        items = [(costs.get(project, default), project) for project in self.projects]
+        items += [(sum([costs.get(project, default) for project in self.workspace_projects(workspace)]),
+            workspace) for workspace in self.workspaces]
+
+        loads = [0] * count
+        names = set()
+        for cost, name in sorted(items, key=lambda item: (-item[0], item[1])):
+            least_loaded = loads.index(min(loads))
+            loads[least_loaded] += cost
+            if least_loaded == index - 1:
+                names.add(name)
+        return names
 
 class Generator:
     def __init__(self, projects_file):
         if type(projects_file) is not dict:
             try:
                 with open(projects_file, 'rt') as f:
-                    self.projects_dict = yaml.load(f)
+                    self.projects_dict = load_yaml(f)
             except IOError:
                raise IOError("The main progen projects file %s doesn't exist." % projects_file)
         else:
             self.projects_dict = projects_file
+        self.projects_file = projects_file
         self.workspaces = {}
         self.settings = ProjectSettings()
+        self._index = None
 
         if 'settings' in self.projects_dict:
             self.settings.update(self.projects_dict['settings'])
 
-    def generate(self, name=''):
-        found = False
+        self.record_cache = RecordCache(self.settings.cache_dir, self.settings.cache)
+        # directories shared by projects are listed once
+        fs_index = None
+        if self.settings.fs_index and self.settings.cache:
+            fs_index = os.path.join(self.settings.cache_dir, 'fs_index')
+        self.fs = FileSystemSnapshot(fs_index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = ProjectIndex(self.projects_dict)
+        return self._index
+
+    def _load_records(self, records):
+        return load_yaml_records(records, self.record_cache, self.settings.record_jobs)
+
+    def load_project(self, name, workspace_name=None):
+        return Project(name, self._load_records(self.index.records(name)), self.settings, workspace_name, self.fs)
+
+    def load_workspace(self, name):
+        members = self.index.workspace_projects(name)
+        if self.settings.record_jobs > 1:
+            # read records of all members at once, the projects get them from the record cache
+            self._load_records(uniqify(flatten([self.index.records(project) for project in members])))
+        projects = [self.load_project(project, name) for project in members]
+        self.workspaces[name] = ProjectWorkspace(name, projects, self.settings, self.index.workspace_settings(name))
+        return self.workspaces[name]
+
+    def shard_costs(self, path=None):
+        """ Projects cost estimates for sharding, from a costs file
+
+        The file maps projects to their costs (YAML), see save_shard_costs. All
+        shards must read the same costs, the file is an input shared by the runners.
+        The local manifest is not used, each runner records only its own projects.
+        Without a file there are no costs, see ProjectIndex.shard.
+        """
+        if not path:
+            return {}
+        with open(path, 'rt') as f:
+            costs = load_yaml(f) or {}
+        return dict([(str(name), float(cost)) for name, cost in costs.items()])
+
+    def save_shard_costs(self, path):
+        """ Writes costs of projects recorded in the manifest, a file for shard_costs """
+        costs = Manifest(self.settings.cache_dir).costs()
+        with open(path, 'wt') as f:
+            dump_yaml(dict([(name, costs[name]) for name in sorted(costs)]), f, default_flow_style=False)
+        return costs
+
+    def select(self, name='', shard=None, costs=None):
+        """ Names of projects and workspaces to be processed, None if name is not valid
+
+        shard (i, n) selects only projects and workspaces assigned to the shard i,
+        costs are as returned by shard_costs.
+        """
         if name != '':
-            # process project first, workspaces afterwards
-            if 'projects' in self.projects_dict:
-                if name in self.projects_dict['projects'].keys():
-                    found = True
-                    records = self.projects_dict['projects'][name]
-                    yield Project(name, load_yaml_records(uniqify(flatten(records))), self.settings)
-            if 'workspaces' in self.projects_dict:
-                workspace_settings = {}
-                if name in self.projects_dict['workspaces'].keys():
-                    found = True
-                    records = self.projects_dict['workspaces'][name]
-                    if 'settings' in records:
-                        workspace_settings = records['settings'] 
-                    projects = [Project(project, load_yaml_records(uniqify(flatten(self.projects_dict['projects'][project]))), self.settings, name) for project in records['projects']]
-                    self.workspaces[name] = ProjectWorkspace(name, projects, self.settings, workspace_settings)
-                    yield self.workspaces[name]
+            if name not in self.index.projects and name not in self.index.workspaces:
+                return None
+            projects = [name] if name in self.index.projects else []
+            workspaces = [name] if name in self.index.workspaces else []
+        else:
+            projects = self.index.projects
+            workspaces = self.index.workspaces
+        if shard:
+            selected = self.index.shard(shard, costs)
+            logger.debug("Shard %d/%d: %s" % (shard[0], shard[1], ', '.join(sorted(selected))))
+            projects = [project for project in projects if project in selected]
+            workspaces = [workspace for workspace in workspaces if workspace in selected]
+        return projects, workspaces
+
+    def generate(self, name='', shard=None, costs=None):
+        """ Yields projects and workspaces, all of them or the one named
+
+        Projects are processed first, workspaces afterwards. See select() for shard.
+        """
+        selected = self.select(name, shard, costs)
+        if selected is not None:
+            for project in selected[0]:
+                yield self.load_project(project)
+            for workspace in selected[1]:
+                yield self.load_workspace(workspace)
         else:
-            if 'projects' in self.projects_dict:
-                found = True
-                for name, records in sorted(self.projects_dict['projects'].items(),
-                                            key=lambda x: x[0]):
-                    yield Project(name, load_yaml_records(uniqify(flatten(records))), self.settings)
-            if 'workspaces' in self.projects_dict:
-                found = True
-                for name, records in sorted(self.projects_dict['workspaces'].items(),
-                                            key=lambda x: x[0]):
-                    workspace_settings = {}
-                    if 'settings' in records:
-                        workspace_settings = records['settings']
-                    projects = [Project(project, load_yaml_records(uniqify(flatten(self.projects_dict['projects'][project]))), self.settings, name) for project in records['projects']]
-                    self.workspaces[name] = ProjectWorkspace(name, projects, self.settings, workspace_settings)
-                    yield self.workspaces[name]
-
-        if not found:
             logging.error("You specified an invalid project name.")
+        self._finish()
+
+    def _finish(self):
+        """ Logs cache statistics and stores the file system index """
+        logger.debug("Record cache: %d hits, %d misses, %d shared" % (self.record_cache.hits,
+            self.record_cache.misses, self.record_cache.memo_hits))
+        logger.debug("File system: %d directories listed, %d paths stat'ed, %d cached answers, "
+            "%d listings from the index" % (self.fs.listings, self.fs.stats, self.fs.hits, self.fs.index_hits))
+        self.fs.save()
+
+    def resolve(self, names=None, tools=None, copied=False):
+        """ Export data of projects as exporters get it, see ProjectLock
+
+        Returns a list of (project, tool, export data). Workspaces are not resolved,
+        their projects are, if they are listed in names.
+        """
+        if names is None:
+            names = self.index.projects
+        resolved = []
+        for name in [name for name in uniqify(names) if name in self.index.projects]:
+            project = self.load_project(name)
+            project_tools = tools or project._validate_tools(None)
+            if project_tools == -1:
+                continue
+            for tool in project_tools:
+                if ToolsSupported().get_tool(tool) is None:
+                    logger.info("%s: tool %s was not found, not resolved" % (name, tool))
+                    continue
+                project._fill_export_dict(tool, copied)
+                # exporters get views, export data are not modified by them
+                resolved.append((name, tool, project.project['export']))
+        return resolved
+
+    def export(self, kind, names, tool, copied=False, copy=False, manifest=None):
+        """ Generates a project or workspaces one after another for a tool
+
+        Returns a list of ExportResult, an exception fails only its project.
+        """
+        return [self._export(kind, name, tool, copied, copy, manifest)[0] for name in names]
+
+    def _export(self, kind, name, tool, copied=False, copy=False, manifest=None, project=None):
+        """ Generates a project or a workspace for a tool, returns (ExportResult, project)
+
+        A project already loaded is generated, it keeps its scans for other tools.
+        """
+        export = ExportResult(name, tool, kind == 'workspace')
+        start = time.time()
+        try:
+            if kind == 'project':
+                if project is None:
+                    project = self.load_project(name)
+                export.result = project.generate(tool, copied=copied, copy=copy, manifest=manifest)
+            else:
+                project = self.load_workspace(name)
+                export.result = project.generate(tool, copied=copied, copy=copy)
+            export.files = project.generated_files.get(tool)
+        except Exception as e:
+            export.result = -1
+            export.error = '%s: %s' % (type(e).__name__, e)
+            logger.error("%s (%s) failed: %s" % (name, tool, export.error))
+            logger.debug(traceback.format_exc())
+        export.time = time.time() - start
+        return export, project
+
+    def export_many(self, names=None, tools=None, jobs=1, copied=False, copy=False, manifest=None):
+        """ Generates projects and workspaces, returns a list of ExportResult
+
+        names - projects and workspaces, all of them if None
+        tools - tools to generate for, if None projects use tools_supported
+        jobs - number of processes, tasks (a project for a tool) run in a pool if more than 1,
+            otherwise a project is loaded once for all of its tools
+        manifest - skips projects which inputs did not change, see Manifest
+
+        Parsed records and target definitions are shared by the whole batch.
+        Projects are generated first, workspaces afterwards.
+        """
+        if names is None:
+            names = self.index.projects + self.index.workspaces
+        names = uniqify(names)
+        results = []
+        for name in names:
+            if name not in self.index.projects and name not in self.index.workspaces:
+                export = ExportResult(name, None)
+                export.result = -1
+                export.error = 'Invalid project name'
+                results.append(export)
+
+        tasks = []
+        exports = []
+        for name in [name for name in names if name in self.index.projects]:
+            project = None
+            if tools:
+                project_tools = tools
+            else:
+                project = self.load_project(name)
+                project_tools = project._validate_tools(None)
+            if project_tools == -1:
+                export = ExportResult(name, None)
+                export.result = -1
+                results.append(export)
+                continue
+            if jobs > 1:
+                tasks += [('project', [name], tool) for tool in project_tools]
+                continue
+            # the project's scans are shared by its tools
+            for tool in project_tools:
+                export, project = self._export('project', name, tool, copied, copy, manifest, project)
+                exports.append([export])
+        workspaces = [name for name in names if name in self.index.workspaces]
+        for tool in tools or [None]:
+            tasks += [('workspace', group, tool) for group in self.index.workspace_groups(workspaces)]
+
+        if jobs > 1 and len(tasks) > 1:
+            exports += export_parallel(self.projects_file, tasks, jobs, copied, copy, manifest, self.fs)
+        else:
+            exports += [self.export(kind, task_names, tool, copied, copy, manifest) for kind, task_names, tool in tasks]
+        for export in exports:
+            results += export
+        self._finish()
+        return results
@@ -13,12 +13,13 @@
 # limitations under the License.
 
 import os
-import yaml
 import logging
 import bisect
 from collections import defaultdict
 
 from .project import FILES_EXTENSIONS
+from .fs import FileSystemSnapshot
+from .util import dump_yaml
 
 logger = logging.getLogger('progen.yaml')
 
@@ -34,12 +35,12 @@ def _determine_tool(files):
             yield (str(file),"iar_arm")
 
 
-def _scan(section, directory, extensions):
+def _scan(section, directory, extensions, fs=None):
     if section == "sources":
         data_dict = defaultdict(list)  # sources can have group names, making them a dict
     else:
         data_dict = []
-    for dirpath, dirnames, files in os.walk(directory):
+    for dirpath, dirnames, files in (fs or FileSystemSnapshot()).walk(directory):
         for filename in files:
             ext = filename.split('.')[-1]
             relpath = os.path.relpath(dirpath, directory)
@@ -69,13 +70,13 @@ def _scan(section, directory, extensions):
     return l
 
 def _generate_file(filename,data):
-    logger.debug('Writing the following to %s:\n%s' % (filename, yaml.dump(data)))
+    logger.debug('Writing the following to %s:\n%s' % (filename, dump_yaml(data)))
     file = os.path.join(os.getcwd(), filename)
     if os.path.isfile(file):
         os.remove(file)
     try:
         with open(file, 'w+') as f:
-            f.write(yaml.dump(data, default_flow_style=False))
+            f.write(dump_yaml(data, default_flow_style=False))
     except:
         logger.error("Unable to open %s for writing!" % file)
         return -1
@@ -110,10 +111,11 @@ def create_yaml(directory, project_name, board,output_dir):
         'common': {},
         'tool_specific': {}
     }
-    # iterate over the common section defined above
+    # iterate over the common section defined above, the directory is listed once for all sections
+    fs = FileSystemSnapshot()
     for section, extensions in common_section.items():
         # look for files in this directory that have the defined extensions, and add them to our project file
-        project_yaml['common'][section] = _scan(section, directory,extensions)
+        project_yaml['common'][section] = _scan(section, directory,extensions, fs)
 
     project_yaml['common']['target'] = [board] # user passes target in command line
 
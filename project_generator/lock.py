@@ -0,0 +1,136 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+import logging
+import traceback
+
+from .cache import write_atomic
+from .export_data import ExportData, GROUP_FIELDS
+from .generate import ExportResult
+from .manifest import get_versions, input_digest
+from .settings import ProjectSettings
+from .tools_supported import ToolsSupported
+from .util import SOURCE_KEYS
+
+logger = logging.getLogger('progen.lock')
+
+def _encode(export_data):
+    """ JSON values of export data, groups are lists of (group, files) pairs
+
+    Groups are kept as pairs because group names are not always strings.
+    """
+    data = export_data.as_dict()
+    for key in GROUP_FIELDS:
+        if key in data:
+            data[key] = [[group, files] for group, files in data[key].items()]
+    return data
+
+def _decode(data):
+    """ Export data from _encode values """
+    for key in GROUP_FIELDS:
+        if key in data:
+            data[key] = dict([(group, files) for group, files in data[key]])
+    export_data = ExportData(data)
+    export_data.compact()
+    return export_data
+
+class ProjectLock:
+    """ Resolved export data of projects, written by progen resolve
+
+    Generating from a lock needs neither records nor the filesystem scans, the
+    export data is passed to exporters as it is. Paths in the lock are relative
+    to the directory where it was resolved, generate from the same directory.
+
+    Only settings which change the generated data are locked, tool paths, root,
+    caches and jobs are settings of the process which generates.
+    """
+
+    VERSION = 5
+    SETTINGS = ['export_location_format', 'templates']
+
+    def __init__(self, settings, resolved):
+        self.settings = settings
+        # list of (project, tool, export data), see Generator.resolve
+        self.resolved = resolved
+
+    def save(self, path):
+        lock = {
+            'version': self.VERSION,
+            'progen': get_versions(),
+            'settings': dict([(key, getattr(self.settings, key)) for key in self.SETTINGS]),
+            'resolved': [[name, tool, _encode(export_data)] for name, tool, export_data in self.resolved],
+        }
+        write_atomic(path, json.dumps(lock).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path):
+        """ Raises IOError if the file does not exist, RuntimeError if it's not a valid lock """
+        try:
+            with open(path, 'rb') as f:
+                lock = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError):
+            raise IOError("The lock file %s doesn't exist." % path)
+        except ValueError:
+            raise RuntimeError("The lock file %s is not valid." % path)
+        if type(lock) is not dict or lock.get('version') != cls.VERSION:
+            raise RuntimeError("The lock file %s is not valid, resolve the projects again." % path)
+        try:
+            if lock['progen'] != get_versions():
+                logger.warning("The lock file %s was resolved by a different progen version." % path)
+            settings = ProjectSettings()
+            for key in cls.SETTINGS:
+                setattr(settings, key, lock['settings'][key])
+            resolved = [(name, tool, _decode(data)) for name, tool, data in lock['resolved']]
+        except (KeyError, TypeError, ValueError):
+            raise RuntimeError("The lock file %s is not valid." % path)
+        return cls(settings, resolved)
+
+    def projects(self):
+        names = []
+        for name, tool, export_data in self.resolved:
+            if name not in names:
+                names.append(name)
+        return names
+
+    def export_many(self, names=None, tools=None, manifest=None):
+        """ Generates projects from the lock, returns a list of ExportResult """
+        results = []
+        for name, tool, export_data in self.resolved:
+            if (names is not None and name not in names) or (tools is not None and tool not in tools):
+                continue
+            export = ExportResult(name, tool)
+            start = time.time()
+            try:
+                if manifest:
+                    fields = manifest.fields(name, tool)
+                    digest = input_digest(export_data, tool, self.settings, fields) if fields is not None else None
+                    export.files = manifest.check(name, tool, digest)
+                if export.files is None:
+                    view = export_data.view()
+                    export.files = ToolsSupported().get_tool(tool)(view, self.settings).export_project()
+                    if manifest:
+                        fields = sorted(view.accessed)
+                        sources = sum([len(files) for key in SOURCE_KEYS for files in export_data[key].values()])
+                        manifest.update(name, tool, input_digest(export_data, tool, self.settings, fields),
+                            export.files, sources, fields)
+            except Exception as e:
+                export.result = -1
+                export.error = '%s: %s' % (type(e).__name__, e)
+                logger.error("%s (%s) failed: %s" % (name, tool, export.error))
+                logger.debug(traceback.format_exc())
+            export.time = time.time() - start
+            results.append(export)
+        return results
@@ -18,7 +18,8 @@ import logging
 
 import pkg_resources
 
-from .commands import build, clean, generate, init, list_projects
+from .commands import build, clean, generate, init, list_projects, resolve
+from .util import YAML_BACKEND
 
 subcommands = {
     'init': init,
@@ -26,6 +27,7 @@ subcommands = {
     'clean': clean,
     'list': list_projects,
     'build': build,
+    'resolve': resolve,
 }
 
 def main():
@@ -58,6 +60,7 @@ def main():
     logger = logging.getLogger('progen')
 
     logger.debug('This should be the project root: %s', os.getcwd())
+    logger.debug('YAML backend: %s', YAML_BACKEND)
 
     return args.func(args)
 
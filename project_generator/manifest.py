@@ -0,0 +1,180 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import hashlib
+import logging
+
+from .cache import write_atomic, dump_data, load_data
+from .export_data import ExportData, ExportView
+from .paths import PathView, PathStream
+from .tools.tool import Exporter
+
+logger = logging.getLogger('progen.manifest')
+
+_versions = None
+
+def get_versions():
+    """ progen and definitions versions, generated files depend on both """
+    global _versions
+    if _versions is None:
+        _versions = []
+        try:
+            import pkg_resources
+            for package in ['project_generator', 'project_generator_definitions']:
+                try:
+                    _versions.append(pkg_resources.get_distribution(package).version)
+                except pkg_resources.DistributionNotFound:
+                    _versions.append(None)
+        except ImportError:
+            pass
+    return _versions
+
+def _canonical(data):
+    """ Order independent representation of nested dicts """
+    if isinstance(data, (dict, ExportData, ExportView)):
+        return sorted([(repr(k), _canonical(v)) for k, v in data.items()])
+    elif isinstance(data, (list, tuple, PathView)):
+        return [_canonical(v) for v in data]
+    elif isinstance(data, PathStream):
+        # streamed files are not stored, their digest is
+        digest = hashlib.sha1()
+        for path in data:
+            digest.update(path.encode('utf-8') + b'\0')
+        return 'PathStream', digest.hexdigest()
+    return data
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path, None
+    return path, stat.st_mtime, stat.st_size
+
+def _get_templates(export_data, tool, settings):
+    """ Template files which an exporter might use """
+    templates = [os.path.join(Exporter.TEMPLATE_DIR, f) for f in sorted(os.listdir(Exporter.TEMPLATE_DIR))
+        if os.path.isfile(os.path.join(Exporter.TEMPLATE_DIR, f))]
+    templates += export_data['template'] or []
+    for tool_name, tool_templates in sorted(settings.templates.items()):
+        templates += tool_templates
+    return templates
+
+def input_digest(export_data, tool, settings, fields=None):
+    """ Digest of everything a generated project depends on
+
+    export_data is the data for the tool (Project._fill_export_dict), it is the result
+    of merging records and scanning source and include directories. fields are keys
+    of export data the exporter used (ExportView.accessed), all keys if None. Lazy
+    fields which are not in fields are not resolved.
+    """
+    if fields is not None:
+        data = dict([(key, export_data[key]) for key in fields if key in export_data])
+    else:
+        data = export_data
+    inputs = [
+        get_versions(),
+        tool,
+        _canonical(data),
+        [_file_stamp(template) for template in _get_templates(export_data, tool, settings)],
+        _canonical([settings.paths, settings.templates, settings.export_location_format, settings.root]),
+    ]
+    return hashlib.sha1(repr(inputs).encode('utf-8')).hexdigest()
+
+class Manifest:
+    """ Inputs and generated files of projects from previous runs
+
+    A project for a tool is up to date if the digest of its inputs did not change
+    and the files it generated last time still exist. Each decision is recorded
+    in the report, (project, tool, generated, reason) tuples.
+    """
+
+    VERSION = 3
+
+    def __init__(self, cache_dir, force=False):
+        self.path = os.path.join(cache_dir, 'manifest')
+        self.force = force
+        self.entries = {}
+        self.report = []
+        try:
+            with open(self.path, 'rb') as f:
+                manifest = load_data(f.read())
+            if manifest['version'] == self.VERSION:
+                self.entries = manifest['entries']
+        except (IOError, OSError):
+            pass
+        except Exception:
+            logger.debug("Invalid manifest %s, all projects will be generated" % self.path)
+
+    @staticmethod
+    def _outputs_exist(files):
+        if type(files) is not dict:
+            return True
+        for output in files.get('files', {}).values():
+            if output and not os.path.exists(output):
+                return False
+        return True
+
+    def check(self, project_name, tool, digest):
+        """ Returns files generated last time if the project is up to date, None otherwise """
+        entry = self.entries.get((project_name, tool))
+        if self.force:
+            reason = 'forced'
+        elif entry is None:
+            reason = 'no previous run'
+        elif entry['digest'] != digest:
+            reason = 'inputs changed'
+        elif not self._outputs_exist(entry['files']):
+            reason = 'generated files missing'
+        else:
+            self.report.append((project_name, tool, False, 'inputs unchanged'))
+            logger.debug("%s (%s) skipped: inputs unchanged" % (project_name, tool))
+            return entry['files']
+        self.report.append((project_name, tool, True, reason))
+        logger.debug("%s (%s) generated: %s" % (project_name, tool, reason))
+        return None
+
+    def update(self, project_name, tool, digest, files, sources=0, fields=None):
+        self.entries[(project_name, tool)] = {
+            'digest': digest,
+            'files': files,
+            'sources': sources,
+            'fields': fields,
+        }
+
+    def fields(self, project_name, tool):
+        """ Keys of export data the exporter used last time, None if they are not known """
+        entry = self.entries.get((project_name, tool))
+        return entry.get('fields') if entry else None
+
+    def costs(self):
+        """ Estimated cost of generating projects, source files count from the last run """
+        costs = {}
+        for (project_name, tool), entry in self.entries.items():
+            costs[project_name] = max(costs.get(project_name, 0), entry['sources'])
+        return costs
+
+    def summary(self):
+        """ Counts of skipped and generated projects, per reason """
+        reasons = {}
+        for project_name, tool, generated, reason in self.report:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        skipped = len([r for r in self.report if not r[2]])
+        return skipped, len(self.report) - skipped, reasons
+
+    def save(self):
+        try:
+            write_atomic(self.path, dump_data({'version': self.VERSION, 'entries': self.entries}))
+        except (IOError, OSError):
+            logger.debug("Can't write manifest %s" % self.path)
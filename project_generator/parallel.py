@@ -0,0 +1,104 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import multiprocessing
+
+from .manifest import Manifest
+
+# state of a worker process, set by _init_worker
+_worker = {}
+
+class _BufferingHandler(logging.Handler):
+    """ Keeps log records of a task, they are logged by the main process """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        # records are pickled, format arguments and exceptions here
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+def _init_worker(projects_file, level, force):
+    # generate imports this module
+    from .generate import Generator
+
+    handler = _BufferingHandler()
+    root = logging.getLogger()
+    for root_handler in list(root.handlers):
+        root.removeHandler(root_handler)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    generator = Generator(projects_file)
+    _worker['handler'] = handler
+    _worker['generator'] = generator
+    _worker['manifest'] = Manifest(generator.settings.cache_dir, force) if generator.settings.cache else None
+
+def _export(task):
+    """ Runs a task in a worker, returns its results, log records, manifest and index changes """
+    kind, names, tool, copied, copy = task
+    handler = _worker['handler']
+    manifest = _worker['manifest']
+    handler.records = []
+    if manifest:
+        manifest.report = []
+
+    results = _worker['generator'].export(kind, names, tool, copied, copy, manifest)
+
+    report = []
+    entries = {}
+    if manifest:
+        report = manifest.report
+        for project_name, project_tool, generated, reason in report:
+            if generated and (project_name, project_tool) in manifest.entries:
+                entries[(project_name, project_tool)] = manifest.entries[(project_name, project_tool)]
+    return results, handler.records, report, entries, _worker['generator'].fs.take_index_updates()
+
+def export_parallel(projects_file, tasks, jobs, copied=False, copy=False, manifest=None, fs=None):
+    """ Runs Generator.export tasks (kind, names, tool) in a process pool
+
+    Project tasks are done before workspace tasks start. Log records of a task are
+    logged together once the task is done, in the order of tasks. Directories listed
+    by workers are merged to fs (FileSystemSnapshot), for its index. Returns a list
+    of results for each task.
+    """
+    force = manifest.force if manifest else False
+    pool = multiprocessing.Pool(jobs, _init_worker, (projects_file, logging.getLogger().getEffectiveLevel(), force))
+    exports = []
+    try:
+        for kind in ['project', 'workspace']:
+            phase = [task + (copied, copy) for task in tasks if task[0] == kind]
+            for results, records, report, entries, listings in pool.imap(_export, phase):
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+                if manifest:
+                    manifest.report.extend(report)
+                    manifest.entries.update(entries)
+                if fs:
+                    fs.merge_index_updates(listings)
+                exports.append(results)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return exports
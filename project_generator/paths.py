@@ -0,0 +1,239 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from itertools import chain
+
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    from collections import MutableSequence
+
+class PathTable(object):
+    """ Interned paths, each directory and each file name is stored once
+
+    A file is a (directory id, name id) pair, its id indexes arrays. Paths are
+    joined again when they are read, they are the same strings as added. Names
+    which are in many directories (main.c) are stored once as well.
+
+    A path added again gets the same id until the table is sealed. seal() drops
+    the lookup tables, they take more memory than the paths, and joins the names
+    to one string, a str object per name would take more than the name itself.
+    """
+
+    def __init__(self):
+        # directory id -> directory, with the trailing separator
+        self.dirs = []
+        self._dir_ids = {}
+        # file id -> directory id, name id
+        self.file_dirs = array('I')
+        self.file_names = array('I')
+        # names added since the table was sealed, all names until then
+        self.names = []
+        # sealed names, name id -> its slice of the text
+        self._text = ''
+        self._starts = array('I', [0])
+        # lookups while the table is filled
+        self._file_ids = {}
+        self._name_ids = {}
+
+    def add(self, path):
+        """ Id of a path """
+        if self._file_ids is not None and path in self._file_ids:
+            return self._file_ids[path]
+        split = max(path.rfind('/'), path.rfind('\\')) + 1
+        directory, name = path[:split], path[split:]
+        try:
+            dir_id = self._dir_ids[directory]
+        except KeyError:
+            dir_id = self._dir_ids[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        name_id = self._name_ids.get(name) if self._name_ids is not None else None
+        if name_id is None:
+            name_id = len(self._starts) - 1 + len(self.names)
+            self.names.append(name)
+            if self._name_ids is not None:
+                self._name_ids[name] = name_id
+        file_id = len(self.file_dirs)
+        self.file_dirs.append(dir_id)
+        self.file_names.append(name_id)
+        if self._file_ids is not None:
+            self._file_ids[path] = file_id
+        return file_id
+
+    def name(self, name_id):
+        sealed = len(self._starts) - 1
+        if name_id < sealed:
+            return self._text[self._starts[name_id]:self._starts[name_id + 1]]
+        return self.names[name_id - sealed]
+
+    def path(self, file_id):
+        return self.dirs[self.file_dirs[file_id]] + self.name(self.file_names[file_id])
+
+    def view(self, paths):
+        """ PathView of paths, added to the table """
+        return PathView(self, array('I', [self.add(path) for path in paths]))
+
+    def seal(self):
+        """ Paths added later are not looked up, they get new ids """
+        if self._file_ids is None:
+            return
+        self._file_ids = None
+        self._name_ids = None
+        for name in self.names:
+            self._starts.append(self._starts[-1] + len(name))
+        self._text = ''.join(self.names)
+        self.names = []
+
+    def __len__(self):
+        return len(self.file_dirs)
+
+class PathView(MutableSequence):
+    """ Sequence of paths in a PathTable, it compares equal to lists and tuples
+
+    It supports list operations. A view is copied to its own list when it's
+    modified first, the table and other views are not changed. copy() is a view
+    of the same paths, the paths are not copied.
+    """
+
+    __slots__ = ('table', 'ids', '_list')
+
+    def __init__(self, table, ids):
+        self.table = table
+        self.ids = ids
+        # paths of a modified view
+        self._list = None
+
+    def _modified(self):
+        if self._list is None:
+            self._list = list(self)
+            self.table = self.ids = None
+        return self._list
+
+    def __getitem__(self, index):
+        if self._list is not None:
+            return self._list[index]
+        if isinstance(index, slice):
+            return PathView(self.table, self.ids[index])
+        return self.table.path(self.ids[index])
+
+    def __setitem__(self, index, value):
+        self._modified()[index] = value
+
+    def __delitem__(self, index):
+        del self._modified()[index]
+
+    def insert(self, index, value):
+        self._modified().insert(index, value)
+
+    def extend(self, values):
+        # values might be this view
+        self._modified().extend(list(values))
+
+    def sort(self, key=None, reverse=False):
+        self._modified().sort(key=key, reverse=reverse)
+
+    def copy(self):
+        if self._list is not None:
+            return list(self._list)
+        return PathView(self.table, self.ids)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __len__(self):
+        if self._list is not None:
+            return len(self._list)
+        return len(self.ids)
+
+    def __iter__(self):
+        if self._list is not None:
+            return iter(self._list)
+        return self._paths()
+
+    def _paths(self):
+        path = self.table.path
+        for file_id in self.ids:
+            yield path(file_id)
+
+    def __eq__(self, other):
+        if isinstance(other, (PathView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'PathView(%r)' % list(self)
+
+    def __getstate__(self):
+        return self.table, self.ids, self._list
+
+    def __setstate__(self, state):
+        self.table, self.ids, self._list = state
+
+class PathStream(object):
+    """ Paths produced each time they are iterated, they are not stored
+
+    function(*args) returns an iterator of the paths, it's called by each
+    iteration. A stream has no len(), list() would iterate it twice, count()
+    and bool() iterate the paths. A pickled stream is a list of its paths.
+    """
+
+    __slots__ = ('function', 'args')
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __iter__(self):
+        return iter(self.function(*self.args))
+
+    def count(self):
+        return sum([1 for path in self])
+
+    def __bool__(self):
+        for path in self:
+            return True
+        return False
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return 'PathStream(%r)' % (self.function,)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def map(self, function):
+        """ Stream of function(path) for paths of this stream """
+        return PathStream(_mapped, function, self)
+
+def _mapped(function, paths):
+    for path in paths:
+        yield function(path)
+
+def chain_paths(sequences):
+    """ Paths of sequences one after another, a PathStream if one of them is a stream """
+    sequences = list(sequences)
+    if any([isinstance(paths, PathStream) for paths in sequences]):
+        return PathStream(chain.from_iterable, sequences)
+    return list(chain(*sequences))
@@ -0,0 +1,159 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Glob patterns in sources and includes
+
+A pattern is matched against paths with / as a separator:
+    *  - any characters except /
+    ?  - any character except /
+    [] - any character in the brackets, [!...] any character not in them
+    ** - any number of directories, src/** are all files in src recursively
+An entry starting with ! excludes paths, !**/test/** excludes test directories,
+they are not walked at all.
+"""
+
+import os
+import re
+
+GLOB_CHARS = '*?['
+
+# pattern -> compiled regular expression
+_compiled = {}
+
+def _normalize(path):
+    return os.path.normpath(path.replace('\\', '/')).replace(os.sep, '/')
+
+def is_pattern(entry):
+    """ True for glob patterns and excludes, plain paths are not patterns """
+    return entry.startswith('!') or any([c in entry for c in GLOB_CHARS])
+
+def compile_pattern(pattern):
+    """ Regular expression matching paths with the pattern """
+    try:
+        return _compiled[pattern]
+    except KeyError:
+        pass
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and pattern.find(']', i + 1) != -1:
+            end = pattern.find(']', i + 1)
+            chars = pattern[i + 1:end]
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            regex += '[%s]' % chars.replace('\\', '\\\\')
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    compiled = _compiled[pattern] = re.compile(regex + '$')
+    return compiled
+
+class PathMatcher(object):
+    """ Compiled exclude patterns
+
+    A directory is pruned if an exclude pattern ends with /** and the rest of it
+    matches the directory, nothing inside can be included then.
+    """
+
+    def __init__(self, excludes=None):
+        self.excludes = []
+        self.prune = []
+        for exclude in excludes or []:
+            exclude = _normalize(exclude.lstrip('!'))
+            self.excludes.append(compile_pattern(exclude))
+            if exclude.endswith('/**'):
+                self.prune.append(compile_pattern(exclude[:-3]))
+
+    def excluded(self, path):
+        if not self.excludes:
+            return False
+        path = _normalize(path)
+        for regex in self.excludes:
+            if regex.match(path):
+                return True
+        return False
+
+    def pruned(self, directory):
+        if not self.prune:
+            return False
+        directory = _normalize(directory)
+        for regex in self.prune:
+            if regex.match(directory):
+                return True
+        return False
+
+def glob(pattern, fs, matcher=None):
+    """ Files matching the pattern, sorted. fs is a FileSystemSnapshot """
+    pattern = _normalize(pattern)
+    regex = compile_pattern(pattern)
+    parts = pattern.split('/')
+    static = []
+    for part in parts:
+        if is_pattern(part):
+            break
+        static.append(part)
+    if len(static) == len(parts):
+        # not a pattern, the path itself
+        return [pattern] if fs.isfile(pattern) else []
+    base = '/'.join(static) or '.'
+    # without ** only a fixed number of directories below base can match
+    max_depth = None if '**' in pattern else len(parts) - len(static) - 1
+
+    matched = []
+    depths = {base: 0}
+    for dirpath, dirs, files in fs.walk(base):
+        depth = depths[dirpath]
+        if max_depth is not None and depth >= max_depth:
+            dirs[:] = []
+        elif matcher:
+            dirs[:] = [d for d in dirs if not matcher.pruned(os.path.join(dirpath, d))]
+        for d in dirs:
+            depths[os.path.join(dirpath, d)] = depth + 1
+        for f in files:
+            path = _normalize(os.path.join(dirpath, f))
+            if regex.match(path) and not (matcher and matcher.excluded(path)):
+                matched.append(path)
+    return sorted(matched)
+
+def expand(entries, fs, matcher=None, extensions=None):
+    """ Replaces patterns in a list of sources or includes by files they match
+
+    Exclude entries are dropped, they are in the matcher. Plain entries which are
+    excluded are dropped as well. extensions filter files matched by patterns.
+    """
+    paths = []
+    for entry in entries:
+        if entry.startswith('!'):
+            continue
+        if not is_pattern(entry):
+            if not (matcher and matcher.excluded(entry)):
+                paths.append(entry)
+            continue
+        for path in glob(entry, fs, matcher):
+            if extensions is None or path.split('.')[-1].lower() in extensions:
+                paths.append(os.path.normpath(path))
+    return paths
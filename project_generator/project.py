@@ -14,14 +14,20 @@
 
 import os
 import shutil
+import hashlib
 import logging
 import operator
 import copy
-import yaml
+from collections import OrderedDict
 
 from .tools_supported import ToolsSupported
 from .tools.tool import get_tool_template
-from .util import merge_recursive, PartialFormatter, FILES_EXTENSIONS, VALID_EXTENSIONS, FILE_MAP, OUTPUT_TYPES, SOURCE_KEYS, fix_paths
+from .export_data import FILE_FIELDS
+from .manifest import input_digest
+from .fs import FileSystemSnapshot, list_directory
+from .paths import PathStream, chain_paths
+from .patterns import PathMatcher, is_pattern, expand as expand_patterns
+from .util import merge_recursive, OrderedSet, get_file_groups, PartialFormatter, FILES_EXTENSIONS, VALID_EXTENSIONS, FILE_MAP, OUTPUT_TYPES, SOURCE_KEYS, fix_paths, dump_yaml
 
 logger = logging.getLogger('progen.project')
 
@@ -35,10 +41,11 @@ class ProjectWorkspace:
         self.workspace_settings = workspace_settings
         self.generated_files = {}
 
-    def generate(self, tool, copied=False, copy=False):
+    def generate(self, tool, copied=False, copy=False, manifest=None):
         """ Generates a workspace """
 
         # copied - already done by external script, copy - do actual copy
+        # manifest - not used, workspaces are always generated
 
         tools = []
         if not tool:
@@ -94,7 +101,8 @@ class ProjectWorkspace:
                 if copy:
                     project._copy_sources_to_generated_destination()
                 project.project['export']['singular'] = False
-                files = tool_export(project.project['export'], self.settings).export_project()
+                files = tool_export(project.project['export'].view(), self.settings).export_project()
+                project._release_digests()
                 # we gather all generated files, needed for workspace files
                 workspace_dic['projects'].append(files)
                 generated_files['projects'].append(files)
@@ -170,19 +178,64 @@ class ProjectTemplate:
         project_template.update(ProjectTemplate._get_tool_specific_data_template())
         return project_template
 
+def _stream_files(entries, extensions, matcher, rel_path, digests):
+    """ Files of source entries with extensions, see Project._stream_source_files
+
+    Directories are listed as they are reached, files of a directory are sorted
+    by their names. Only one listing is kept at a time. digests is shared by the
+    streams of an export, it keeps a digest of the files of each stream. If the
+    files differ in another iteration during the export (the tree changed),
+    RuntimeError is raised once they are iterated.
+    """
+    # files in declared directories come with their directory
+    directories = set([os.path.normpath(entry) for entry in entries
+        if not is_pattern(entry) and os.path.isdir(entry)])
+    digest = hashlib.sha1()
+    listed = set()
+    for entry in expand_patterns(entries, FileSystemSnapshot(), matcher):
+        entry = os.path.normpath(entry)
+        if os.path.isdir(entry):
+            if entry in listed:
+                continue
+            listed.add(entry)
+            try:
+                names = [e[0] for e in list_directory(entry) if e[2]]
+            except OSError:
+                logger.debug("The sources are not accessible: %s" % entry)
+                continue
+            paths = [os.path.join(entry, name) for name in sorted(names)]
+        elif os.path.dirname(entry) in directories:
+            continue
+        else:
+            paths = [entry]
+        for path in paths:
+            if path.split('.')[-1].lower() in extensions and not (matcher and matcher.excluded(path)):
+                path = os.path.normpath(os.path.join(rel_path, path))
+                digest.update(path.encode('utf-8') + b'\0')
+                yield path
+    # entries of a group are shared by its streams, they live as long as the streams
+    key = (id(entries), tuple(extensions))
+    if digests.setdefault(key, digest.digest()) != digest.digest():
+        raise RuntimeError("Sources %s changed while they were exported" % ', '.join(entries))
+
 class Project:
 
     """ Represents a project, which can be formed of many yaml files """
 
-    def __init__(self, name, project_dicts, settings, workspace_name=None):
-        """ Initialise a project with a yaml file """
+    def __init__(self, name, project_dicts, settings, workspace_name=None, fs=None):
+        """ Initialise a project with a yaml file
+
+        fs is a FileSystemSnapshot, projects of a generator share it
+        """
 
         assert type(project_dicts) is list, "Project records/dics must be a list" % project_dicts 
 
         self.settings = settings
         self.name = name
         self.workspace_name = workspace_name
+        self.fs = fs or FileSystemSnapshot()
         self.project = {}
+        self._digests = {}
         self.project['common'] = {}
         self.project['export'] = {} # merged common and tool
         self.project['tool_specific'] = {}
@@ -207,6 +260,8 @@ class Project:
                             self.project['tool_specific'][tool_name] = ProjectTemplate.get_project_template(self.name, OUTPUT_TYPES['exe'])
                         self._set_project_attributes(tool_name, self.project['tool_specific'][tool_name], project_data['tool_specific'])
         self.generated_files = {}
+        # common sources and includes, the same for all tools
+        self._common_scan = None
 
     @staticmethod
     def _list_elim_none(list_to_clean):
@@ -246,82 +301,170 @@ class Project:
                             if data:
                                 destination[attribute] = data
 
-    def _set_internal_common_data(self):
+    @staticmethod
+    def _get_declared_paths(declared):
+        """ Paths in sources or includes, which can be lists, dicts of groups or paths """
+        paths = []
+        for files in declared:
+            if type(files) == dict:
+                paths += Project._get_declared_paths(list(files.values()))
+            elif type(files) == list:
+                paths += Project._get_declared_paths(files)
+            elif files:
+                paths.append(files)
+        return paths
+
+    def _prefetch(self, declared):
+        """ List declared directories concurrently, the scan gets them from the snapshot """
+        if self.settings.scan_jobs > 1:
+            paths = [os.path.normpath(path.replace('\\', '/')) for path in self._get_declared_paths(declared)
+                if not is_pattern(path)]
+            self.fs.prefetch(paths, self.settings.scan_jobs)
+
+    def _get_matcher(self, declared):
+        """ Exclude patterns (!pattern) in sources or includes, they apply to all of them """
+        return PathMatcher([path for path in self._get_declared_paths(declared) if path.startswith('!')])
+
+    def _open_paths(self):
+        """ Paths and group files are ordered sets while sources and includes are processed """
+        export = self.project['export']
+        for key in ['source_paths', 'include_paths']:
+            export[key] = OrderedSet(export[key])
+        for key in SOURCE_KEYS + ['include_files']:
+            for group_name, files in export[key].items():
+                export[key][group_name] = OrderedSet(files)
+
+    def _close_paths(self):
+        """ Exporters get lists """
+        export = self.project['export']
+        for key in ['source_paths', 'include_paths']:
+            export[key] = list(export[key])
+        for key in SOURCE_KEYS + ['include_files']:
+            for group_name, files in export[key].items():
+                export[key][group_name] = list(files)
+
+    def _set_internal_common_data(self, with_sources=True):
         # process here includes, sources and set all internal data related to them
-        for files in self.project['common']['sources']:
-            self._process_source_files(files)
+        self._prefetch((self.project['common']['sources'] if with_sources else []) + self.project['common']['includes'])
+        self._open_paths()
+        if with_sources:
+            matcher = self._get_matcher(self.project['common']['sources'])
+            for files in self.project['common']['sources']:
+                self._process_source_files(files, matcher=matcher)
+        matcher = self._get_matcher(self.project['common']['includes'])
         for files in self.project['common']['includes']:
-            self._process_include_files(files)
-
-    def _set_internal_tool_data(self, tool_keywords):
+            self._process_include_files(files, matcher=matcher)
+        self._close_paths()
+
+    def _get_common_scan(self):
+        """ Export data derived from common sources and includes
+
+        Directories are scanned once per project, each tool gets a copy. Groups are
+        sorted as _fill_export_dict sorts them.
+        """
+        if self._common_scan is None:
+            export = self.project['export']
+            self.project['export'] = get_tool_template()
+            self._set_internal_common_data()
+            self._common_scan = {}
+            for key in SOURCE_KEYS + ['include_files', 'source_paths', 'include_paths']:
+                self._common_scan[key] = self.project['export'][key]
+            for key in SOURCE_KEYS:
+                for k, v in self._common_scan[key].items():
+                    v.sort(key=lambda x: os.path.basename(x))
+            self.project['export'] = export
+        return copy.deepcopy(self._common_scan)
+
+    def _set_internal_tool_data(self, tool_keywords, with_sources=True):
         # process here includes, sources and set all internal data related to them for tool_keywords
+        sources = list(self.project['common']['sources'])
+        includes = list(self.project['common']['includes'])
+        for tool in tool_keywords:
+            if tool in self.project['tool_specific'].keys():
+                sources += self.project['tool_specific'][tool].get('sources', [])
+                includes += self.project['tool_specific'][tool].get('includes', [])
+        self._prefetch((sources[len(self.project['common']['sources']):] if with_sources else []) +
+            includes[len(self.project['common']['includes']):])
+        # common excludes apply to tool sources and includes too
+        sources_matcher = self._get_matcher(sources)
+        includes_matcher = self._get_matcher(includes)
+        self._open_paths()
         for tool in tool_keywords:
             if tool in self.project['tool_specific'].keys():
                 if 'includes' in self.project['tool_specific'][tool]:
                     for files in self.project['tool_specific'][tool]['includes']:
-                        self._process_include_files(files)
-                if 'sources' in self.project['tool_specific'][tool]:
+                        self._process_include_files(files, matcher=includes_matcher)
+                if with_sources and 'sources' in self.project['tool_specific'][tool]:
                     for files in self.project['tool_specific'][tool]['sources']:
-                        self._process_source_files(files)
+                        self._process_source_files(files, matcher=sources_matcher)
+        self._close_paths()
 
-    def _process_include_files(self, files, use_group_name = 'default'):
+    def _process_include_files(self, files, use_group_name = 'default', matcher=None):
         # If it's dic add it , if file, add it to files
         use_includes = []
         if type(files) == dict:
             for group_name, include_files in files.items():
-                self._process_include_files(include_files, group_name)
+                self._process_include_files(include_files, group_name, matcher)
         elif type(files) == list:
             use_includes = files
         else:
             if files:
                 use_includes = [files]
+        # patterns are replaced by header files they match
+        use_includes = expand_patterns([f for f in use_includes if f], self.fs, matcher,
+            FILES_EXTENSIONS['include_files'])
 
         if use_group_name not in self.project['export']['include_files'] and use_includes:
-            self.project['export']['include_files'][use_group_name] = []
+            self.project['export']['include_files'][use_group_name] = OrderedSet()
 
         for include_file in use_includes:
             include_file = include_file.replace('\\', '/')
             # include might be set to None - empty yaml list
             if include_file:
-                if os.path.isdir(include_file):
+                if self.fs.isdir(include_file):
                    # its a directory
                     dir_path = include_file
                     # get all files from dir
                     include_files = []
                     try:
-                        for f in os.listdir(dir_path):
-                            if os.path.isfile(os.path.join(os.path.normpath(dir_path), f)) and f.split('.')[-1].lower() in FILES_EXTENSIONS['include_files']:
-                                include_files.append(os.path.join(os.path.normpath(dir_path), f))
+                        for f in self.fs.files(dir_path):
+                            include_file = os.path.join(os.path.normpath(dir_path), f)
+                            if f.split('.')[-1].lower() in FILES_EXTENSIONS['include_files'] and not (matcher and matcher.excluded(include_file)):
+                                include_files.append(include_file)
                     except:
                         # TODO: catch only those exceptions which are relevant
                         logger.debug("The includes is not accessible: %s" % include_file)
                         continue
-                    self.project['export']['include_files'][use_group_name] += include_files
+                    self.project['export']['include_files'][use_group_name].update(include_files)
                 else:
                     # include files are in groups as sources
-                    self.project['export']['include_files'][use_group_name].append(os.path.normpath(include_file))
+                    self.project['export']['include_files'][use_group_name].add(os.path.normpath(include_file))
                     dir_path = os.path.dirname(include_file)
-                if not os.path.normpath(dir_path) in self.project['export']['include_paths']:
-                    self.project['export']['include_paths'].append(os.path.normpath(dir_path))
+                self.project['export']['include_paths'].add(os.path.normpath(dir_path))
 
-    def _process_source_files(self, files, use_group_name='default'):
+    def _process_source_files(self, files, use_group_name='default', matcher=None, expand=True):
+        # expand - entries are written by users, listed files are not patterns
         use_sources = []
         if type(files) == dict:
             for group_name, sources in files.items():
                 # process each group name as separate entity
-                self._process_source_files(Project._list_elim_none(sources), group_name)
+                self._process_source_files(Project._list_elim_none(sources), group_name, matcher)
         elif type(files) == list:
             use_sources = Project._list_elim_none(files)
         else:
             if files:
                 use_sources = [files]
+        # patterns are replaced by files they match
+        if expand:
+            use_sources = expand_patterns(use_sources, self.fs, matcher)
 
         for source_file in use_sources:
             source_file = os.path.normpath(source_file)
-            if os.path.isdir(source_file):
-                self.project['export']['source_paths'].append(source_file)
-                self._process_source_files([os.path.join(source_file, f) for f in os.listdir(
-                    source_file) if os.path.isfile(os.path.join(source_file, f))], use_group_name)
+            if self.fs.isdir(source_file):
+                self.project['export']['source_paths'].add(source_file)
+                self._process_source_files([os.path.join(source_file, f) for f in self.fs.files(
+                    source_file) if not (matcher and matcher.excluded(os.path.join(source_file, f)))], use_group_name,
+                    expand=False)
 
             # Based on the extension, create a groups inside source_files_(extension)
             extension = source_file.split('.')[-1].lower()
@@ -329,12 +472,61 @@ class Project:
                 continue
             source_group = FILE_MAP[extension]
             if use_group_name not in self.project['export'][source_group]:
-                self.project['export'][source_group][use_group_name] = []
+                self.project['export'][source_group][use_group_name] = OrderedSet()
 
-            self.project['export'][source_group][use_group_name].append(source_file)
+            self.project['export'][source_group][use_group_name].add(source_file)
+            self.project['export']['source_paths'].add(os.path.normpath(os.path.dirname(source_file)))
 
-            if not os.path.dirname(source_file) in self.project['export']['source_paths']:
-                self.project['export']['source_paths'].append(os.path.normpath(os.path.dirname(source_file)))
+    @staticmethod
+    def _get_group_entries(files, groups, use_group_name='default'):
+        """ Source entries of each group, grouped as _process_source_files groups them """
+        if type(files) == dict:
+            for group_name, sources in files.items():
+                Project._get_group_entries(Project._list_elim_none(sources), groups, group_name)
+        elif type(files) == list:
+            groups.setdefault(use_group_name, []).extend(Project._list_elim_none(files))
+        elif files:
+            groups.setdefault(use_group_name, []).append(files)
+
+    def _stream_source_files(self, tool_keywords):
+        """ Groups of sources are PathStreams, for settings.stream_sources
+
+        Files are not stored, they are listed each time an exporter iterates a
+        group, directory by directory (_stream_files). Digests of the files are
+        kept until the export is done (_release_digests), an export fails if its
+        files change meanwhile. Paths are relative to the output dir already.
+        Each declared group has a stream for each source key, streams of the
+        groups without such files are empty.
+        """
+        sources = list(self.project['common']['sources'])
+        for tool in tool_keywords:
+            if tool in self.project['tool_specific'].keys():
+                sources += self.project['tool_specific'][tool].get('sources', [])
+        matcher = self._get_matcher(sources)
+        groups = OrderedDict()
+        for files in sources:
+            self._get_group_entries(files, groups)
+
+        export = self.project['export']
+        rel_path = export['output_dir']['rel_path']
+        source_paths = OrderedSet(export['source_paths'])
+        self._digests = {}
+        for group_name, entries in groups.items():
+            for key in SOURCE_KEYS:
+                export[key][group_name] = PathStream(_stream_files, entries, FILES_EXTENSIONS[key],
+                    matcher, rel_path, self._digests)
+            # patterns are matched once here, directories are not listed
+            for entry in expand_patterns(entries, FileSystemSnapshot(), matcher):
+                entry = os.path.normpath(entry)
+                if self.fs.isdir(entry):
+                    source_paths.add(entry)
+                elif entry.split('.')[-1].lower() in VALID_EXTENSIONS:
+                    source_paths.add(os.path.normpath(os.path.dirname(entry)))
+        export['source_paths'] = list(source_paths)
+
+    def _release_digests(self):
+        """ Drops digests of streamed sources, an export is done """
+        self._digests.clear()
 
     def _validate_tools(self, tool):
         """ Use tool_supported or tool """
@@ -425,39 +617,27 @@ class Project:
         tool_keywords = list(set(tool_keywords))
 
         # Set the template keys an get the relative path to fix all paths
+        # common data are copied, tool data must not be merged to them
         self.project['export'] = get_tool_template()
-        self.project['export'].update(self.project['common'])
+        self.project['export'].update(copy.deepcopy(self.project['common']))
 
         self._set_output_dir_path(tool, copied)
 
-        self._set_internal_common_data()
-        self._set_internal_tool_data(tool_keywords)
-
         # Merge common project data with tool specific data
-        self.project['export']['source_paths'] += self._get_tool_data('source_paths', tool_keywords)
-        self.project['export']['include_paths'] += self._get_tool_data('include_paths', tool_keywords)
         self.project['export']['linker_file'] =  self.project['export']['linker_file'] or self._get_tool_data('linker_file', tool_keywords)
         self.project['export']['macros'] += self._get_tool_data('macros', tool_keywords)
         self.project['export']['template'] = self._get_tool_data('template', tool_keywords)
 
-        fix_paths(self.project['export'], self.project['export']['output_dir']['rel_path'], list(FILES_EXTENSIONS.keys()) + ['include_paths', 'source_paths'])
+        fix_paths(self.project['export'], self.project['export']['output_dir']['rel_path'], ['linker_file'])
 
         # misc for tools requires dic merge
         misc = self._get_tool_data('misc', tool_keywords)
         for m in misc:
            self.project['export']['misc'] = merge_recursive(self.project['export']['misc'], m)
 
-        # This is magic with sources/include_files as they have groups
-        tool_sources = self._get_tool_sources(tool_keywords)
-        for key in SOURCE_KEYS:
-            self.project['export'][key] = merge_recursive(self.project['export'][key], tool_sources[key])
-            # sort all sources within its own group and own category (=k)
-            # the tool needs to do sort files as tools require further processing based on 
-            # categories (we can't mix now cpp and c files for instance)
-            for k, v in self.project['export'][key].items():
-                self.project['export'][key][k] = sorted(v, key=lambda x: os.path.basename(x))
-
-        self.project['export']['include_files'] = merge_recursive(self.project['export']['include_files'], self._get_tool_includes(tool_keywords))
+        # sources and includes are resolved when an exporter needs them
+        export = self.project['export']
+        export.set_lazy(FILE_FIELDS, lambda data: self._resolve_files(data, tool_keywords))
 
         # linker checkup
         if len(self.project['export']['linker_file']) == 0 and self.project['export']['output_type'] == 'exe':
@@ -472,6 +652,58 @@ class Project:
                 return
             self.project['export']['linker_file'] = self.project['export']['linker_file'][0]
 
+    def _resolve_files(self, export, tool_keywords):
+        """ Sources and includes of export data, scans directories """
+        current = self.project['export']
+        self.project['export'] = export
+        stream = self.settings.stream_sources
+        try:
+            if stream:
+                self._set_internal_common_data(with_sources=False)
+                self._set_internal_tool_data(tool_keywords, with_sources=False)
+                self._stream_source_files(tool_keywords)
+            else:
+                self.project['export'].update(self._get_common_scan())
+                self._set_internal_tool_data(tool_keywords)
+
+            self.project['export']['source_paths'] += self._get_tool_data('source_paths', tool_keywords)
+            self.project['export']['include_paths'] += self._get_tool_data('include_paths', tool_keywords)
+
+            # streamed sources are fixed as they are listed
+            fix_paths(self.project['export'], self.project['export']['output_dir']['rel_path'],
+                [key for key in FILES_EXTENSIONS.keys() if key != 'linker_file' and not (stream and key in SOURCE_KEYS)] +
+                ['include_paths', 'source_paths'])
+
+            # This is magic with sources/include_files as they have groups
+            tool_sources = self._get_tool_sources(tool_keywords)
+            for key in SOURCE_KEYS:
+                if stream:
+                    # streamed files are not sorted, they come directory by directory
+                    for k, v in tool_sources[key].items():
+                        self.project['export'][key][k] = chain_paths([self.project['export'][key].get(k, []), v])
+                    continue
+                self.project['export'][key] = merge_recursive(self.project['export'][key], tool_sources[key])
+                # sort all sources within its own group and own category (=k)
+                # the tool needs to do sort files as tools require further processing based on 
+                # categories (we can't mix now cpp and c files for instance)
+                # common sources are sorted already, only tool sources add work here
+                for k, v in self.project['export'][key].items():
+                    self.project['export'][key][k] = sorted(v, key=lambda x: os.path.basename(x))
+
+            self.project['export']['include_files'] = merge_recursive(self.project['export']['include_files'], self._get_tool_includes(tool_keywords))
+            # exporters take files of groups from here, they don't sort them again
+            self.project['export']['file_groups'] = get_file_groups(self.project['export'])
+            self.project['export'].compact()
+        finally:
+            self.project['export'] = current
+
+    def _get_sources_count(self):
+        """ Number of source files in the export data, 0 if they were not resolved """
+        if not self.project['export'].is_loaded('source_files_c'):
+            return 0
+        return sum([files.count() if isinstance(files, PathStream) else len(files)
+            for key in SOURCE_KEYS for files in self.project['export'][key].values()])
+
     def _copy_sources_to_generated_destination(self):
         """ Copies all project files to specified directory - generated dir """
 
@@ -491,12 +723,13 @@ class Project:
         for item in files:
             s = os.path.join(self.settings.root, item)
             d = os.path.join(destination, item)
-            if os.path.isdir(s):
+            if self.fs.isdir(s):
                 shutil.copytree(s,d)
             else:
                 if not os.path.exists(os.path.dirname(d)):
                     os.makedirs(os.path.join(self.settings.root, os.path.dirname(d)))
                 shutil.copy2(s,d)
+        self.fs.invalidate(destination)
 
     def clean(self, tool):
         """ Clean a project """
@@ -516,8 +749,12 @@ class Project:
                 shutil.rmtree(path)
         return 0
 
-    def generate(self, tool, copied=False, copy=False):
-        """ Generates a project """
+    def generate(self, tool, copied=False, copy=False, manifest=None):
+        """ Generates a project
+
+        If a manifest is given, the tool is skipped if its inputs did not change
+        since the last run. Copying sources always generates.
+        """
 
         tools = self._validate_tools(tool)
         if tools == -1:
@@ -535,6 +772,15 @@ class Project:
                 continue
 
             self._fill_export_dict(export_tool, copied)
+            if manifest and not copy:
+                # only the fields the exporter used last time, others might not be resolved yet
+                fields = manifest.fields(self.name, export_tool)
+                digest = input_digest(self.project['export'], export_tool, self.settings, fields) if fields is not None else None
+                files = manifest.check(self.name, export_tool, digest)
+                if files is not None:
+                    generated_files[export_tool] = files
+                    self._release_digests()
+                    continue
             if copy:
                 logger.debug("Copying sources to the output directory")
                 self._copy_sources_to_generated_destination()
@@ -543,14 +789,20 @@ class Project:
                 dump_data = {}
                 dump_data['common'] = self.project['common']
                 dump_data['tool_specific'] = self.project['tool_specific']
-                dump_data['merged'] = self.project['export']
+                dump_data['merged'] = self.project['export'].as_dict()
                 handler = logging.FileHandler(os.path.join(os.getcwd(), "%s.log" % self.name),"w", encoding=None, delay="true")
                 handler.setLevel(logging.DEBUG)
                 logger.addHandler(handler)
-                logger.debug("\n" + yaml.dump(dump_data))
+                logger.debug("\n" + dump_yaml(dump_data))
 
-            files = exporter(self.project['export'], self.settings).export_project()
+            export = self.project['export'].view()
+            files = exporter(export, self.settings).export_project()
             generated_files[export_tool] = files
+            if manifest and not copy:
+                fields = sorted(export.accessed)
+                manifest.update(self.name, export_tool, input_digest(self.project['export'], export_tool, self.settings,
+                    fields), files, self._get_sources_count(), fields)
+            self._release_digests()
         self.generated_files = generated_files
         return result
 
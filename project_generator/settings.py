@@ -22,6 +22,7 @@ class ProjectSettings:
 
     DEFAULT_EXPORT_LOCATION_FORMAT = join('generated_projects', '{tool}_{project_name}')
     DEFAULT_ROOT = os.getcwd()
+    DEFAULT_CACHE_DIR = '.progen'
 
     def __init__(self):
         """ This are default enviroment settings for build tools. To override,
@@ -40,6 +41,21 @@ class ProjectSettings:
         self.export_location_format = self.DEFAULT_EXPORT_LOCATION_FORMAT
         self.root = os.getcwd()
 
+        # persistent caches (parsed records), PROJECT_GENERATOR_CACHE=0 turns them off
+        self.cache_dir = os.environ.get('PROJECT_GENERATOR_CACHE_DIR') or self.DEFAULT_CACHE_DIR
+        self.cache = os.environ.get('PROJECT_GENERATOR_CACHE', '1') != '0'
+
+        # number of threads reading record files
+        self.record_jobs = int(os.environ.get('PROJECT_GENERATOR_RECORD_JOBS') or 1)
+        # number of threads listing source and include directories of a project
+        self.scan_jobs = int(os.environ.get('PROJECT_GENERATOR_SCAN_JOBS') or 1)
+        # directory listings kept in the cache dir between runs, see FileSystemSnapshot
+        self.fs_index = os.environ.get('PROJECT_GENERATOR_FS_INDEX') == '1'
+        # sources are listed when exporters iterate them, they are not stored, see Project
+        self.stream_sources = os.environ.get('PROJECT_GENERATOR_STREAM_SOURCES') == '1'
+        # compiled templates kept in the cache dir between runs, see get_environment
+        self.template_cache = os.environ.get('PROJECT_GENERATOR_TEMPLATE_CACHE') == '1'
+
     def update(self, settings):
         if settings:
             if 'tools' in settings:
@@ -54,6 +70,20 @@ class ProjectSettings:
                 self.export_location_format = normpath(settings['export_dir'][0])
             if 'root' in settings:
                 self.root = normpath(settings['root'][0])
+            if 'cache_dir' in settings:
+                self.cache_dir = normpath(settings['cache_dir'][0])
+            if 'cache' in settings:
+                self.cache = bool(settings['cache'][0])
+            if 'record_jobs' in settings:
+                self.record_jobs = int(settings['record_jobs'][0])
+            if 'scan_jobs' in settings:
+                self.scan_jobs = int(settings['scan_jobs'][0])
+            if 'fs_index' in settings:
+                self.fs_index = bool(settings['fs_index'][0])
+            if 'stream_sources' in settings:
+                self.stream_sources = bool(settings['stream_sources'][0])
+            if 'template_cache' in settings:
+                self.template_cache = bool(settings['template_cache'][0])
 
     def get_env_settings(self, env_set):
         return self.paths[env_set]
@@ -18,6 +18,7 @@ from os import getcwd
 from .tool import Tool, Exporter
 from .gccarm import MakefileGccArm
 from ..util import SOURCE_KEYS
+from ..paths import PathStream
 
 class CMakeGccArm(Tool,Exporter):
 
@@ -45,6 +46,11 @@ class CMakeGccArm(Tool,Exporter):
         # cmake seems to require unix paths
         # This might do proper handling in the gcc arm, pass there a param (force normpath to unix)
         for key in SOURCE_KEYS:
+            root = getcwd().replace('\\', '/') + '/' + data['output_dir']['path'].replace('\\', '/') + '/'
+            if isinstance(data[key], PathStream):
+                # streamed sources stay streams
+                data[key] = data[key].map(lambda value, root=root: root + value.replace('\\', '/'))
+                continue
             paths = []
             for value in data[key]:
                 # TODO: this needs to be fixed
@@ -67,7 +73,7 @@ class CMakeGccArm(Tool,Exporter):
 
         data_for_make = self.workspace.copy()
         # Warning: we dont use rel path for cmake, we inject there root and use paths within root
-        data_for_make['output_dir']['rel_path'] = ""
+        data_for_make['output_dir'] = dict(data_for_make['output_dir'], rel_path="")
         self.exporter.process_data_for_makefile(data_for_make)
         try:
             data_for_make['misc'] = data_for_make['misc']
@@ -20,7 +20,7 @@ import re
 
 from os.path import basename, join, normpath, splitext
 from os import getcwd
-from project_generator_definitions.definitions import ProGenDef
+from ..definitions import get_definitions
 
 from .tool import Tool, Builder, Exporter
 from ..util import SOURCE_KEYS
@@ -192,7 +192,7 @@ class Coide(Tool, Exporter, Builder):
 
         # set target only if defined, otherwise use from template/default one
         if expanded_dic['target']:
-            pro_def = ProGenDef('coide')
+            pro_def = get_definitions('coide')
             if not pro_def.is_supported(expanded_dic['target'].lower()):
                 raise RuntimeError("Target %s is not supported." % expanded_dic['target'].lower())
             mcu_def_dic = pro_def.get_tool_definition(expanded_dic['target'].lower())
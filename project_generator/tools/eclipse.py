@@ -56,9 +56,6 @@ class EclipseGnuARM(Tool, Exporter, Builder):
         return {"path": join('PARENT-%s-PROJECT_LOC' % new_data['output_dir']['rel_path'], normpath(source)), "name": basename(
                     source), "type": self.file_types[extension.lower()]}
 
-    def _expand_sort_key(self, file) :
-        return file['name'].lower()
-
     def export_workspace(self):
         logger.debug("Current version of CoIDE does not support workspaces")
 
@@ -53,12 +53,11 @@ class ARMNoneEABIGDB(GDB):
 
     def _generate_file(self, port):
         generated_projects = copy.deepcopy(self.generated_project)
-        expanded_dic = self.workspace.copy()
-
-        expanded_dic['gdb_server_port'] = port
+        # only the port is used by the template, sources are not resolved for it
+        expanded_dic = {'gdb_server_port': port}
 
         project_path, startupfile = self.gen_file_jinja(
-            'gdb.tmpl', expanded_dic, '%s.gdbstartup' % expanded_dic['name'], expanded_dic['output_dir']['path'])
+            'gdb.tmpl', expanded_dic, '%s.gdbstartup' % self.workspace['name'], self.workspace['output_dir']['path'])
         generated_projects['path'] = project_path
         generated_projects['files']['startupfile'] = startupfile
         return generated_projects
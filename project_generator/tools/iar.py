@@ -25,10 +25,10 @@ import os
 from os import getcwd
 from os.path import join, normpath
 from collections import OrderedDict
-from project_generator_definitions.definitions import ProGenDef
+from ..definitions import get_definitions
 
 from .tool import Tool, Builder, Exporter
-from ..util import SOURCE_KEYS, FILES_EXTENSIONS, fix_paths
+from ..util import FILES_EXTENSIONS, fix_paths
 
 logger = logging.getLogger('progen.tools.iar')
 
@@ -182,9 +182,9 @@ class IAREmbeddedWorkbenchProject:
         i = 0
         for group_name, files in project_dic['groups'].items():
             ewp_dic['project']['group'].append({'name': group_name, 'file': []})
+            # files are sorted, see get_file_groups
             for file in files:
                 ewp_dic['project']['group'][i]['file'].append({'name': file})
-            ewp_dic['project']['group'][i]['file'] = sorted(ewp_dic['project']['group'][i]['file'], key=lambda x: os.path.basename(x['name'].lower()))
             i += 1
 
     def _clean_xmldict_option(self, dictionary):
@@ -339,19 +339,9 @@ class IAREmbeddedWorkbench(Tool, Builder, Exporter, IAREmbeddedWorkbenchProject)
         if data['linker_file']:
             data['linker_file'] = join('$PROJ_DIR$', data['linker_file'])
 
-        data['groups'] = {}
-        for attribute in SOURCE_KEYS:
-            for k, v in data[attribute].items():
-                if k not in data['groups']:
-                    data['groups'][k] = []
-                data['groups'][k].extend([join('$PROJ_DIR$', file) for file in v])
-        for k,v in data['include_files'].items():
-            if k not in data['groups']:
-                data['groups'][k] = []
-            data['groups'][k].extend([join('$PROJ_DIR$', file) for file in v])
-
-        # sort groups
-        data['groups'] = OrderedDict(sorted(data['groups'].items(), key=lambda t: t[0]))
+        data['groups'] = OrderedDict()
+        for k, v in self._get_file_groups(data).items():
+            data['groups'][k] = [join('$PROJ_DIR$', file) for file in v]
 
     def _get_default_templates(self):
         ewp_dic = xmltodict.parse(open(self.ewp_file).read())
@@ -471,7 +461,7 @@ class IAREmbeddedWorkbench(Tool, Builder, Exporter, IAREmbeddedWorkbenchProject)
         # set target only if defined, otherwise use from template/default one
         if expanded_dic['target']:
             # get target definition (target + mcu)
-            proj_def = ProGenDef('iar')
+            proj_def = get_definitions('iar')
             if not proj_def.is_supported(expanded_dic['target'].lower()):
                 raise RuntimeError("Target %s is not supported." % expanded_dic['target'].lower())
             mcu_def_dic = proj_def.get_tool_definition(expanded_dic['target'].lower())
@@ -498,9 +488,10 @@ class IAREmbeddedWorkbench(Tool, Builder, Exporter, IAREmbeddedWorkbenchProject)
 
         self._ewd_set_name(ewd_dic['project']['configuration'], expanded_dic['name'])
 
-        # IAR uses ident 2 spaces, encoding iso-8859-1
-        ewp_xml = xmltodict.unparse(ewp_dic, encoding='iso-8859-1', pretty=True, indent='  ')
-        project_path, ewp = self.gen_file_raw(ewp_xml, '%s.ewp' % expanded_dic['name'], expanded_dic['output_dir']['path'])
+        # IAR uses ident 2 spaces, encoding iso-8859-1. The project lists all files,
+        # it's written as it's unparsed
+        project_path, ewp = self.gen_file_xml(ewp_dic, '%s.ewp' % expanded_dic['name'],
+            expanded_dic['output_dir']['path'], encoding='iso-8859-1', pretty=True, indent='  ')
 
         ewd_xml = xmltodict.unparse(ewd_dic, encoding='iso-8859-1', pretty=True, indent='  ')
         project_path, ewd = self.gen_file_raw(ewd_xml, '%s.ewd' % expanded_dic['name'], expanded_dic['output_dir']['path'])
@@ -17,13 +17,13 @@ import os
 import logging
 import ntpath
 import subprocess
-from itertools import chain
 
 from os.path import join, normpath,dirname
-from project_generator_definitions.definitions import ProGenDef
+from ..definitions import get_definitions
 
 from .tool import Tool, Exporter
 from ..util import SOURCE_KEYS
+from ..paths import chain_paths
 
 
 class MakefileTool(Tool, Exporter):
@@ -60,9 +60,8 @@ class MakefileTool(Tool, Exporter):
         data['asm_flags'] = []
         for k, v in data['misc'].items():
             if type(v) is list:
-                if k not in data:
-                    data[k] = []
-                data[k].extend(v)
+                # a list of the data is not modified, it's replaced
+                data[k] = list(data.get(k, [])) + v
             else:
                 if k not in data:
                     data[k] = ''
@@ -91,12 +90,12 @@ class MakefileTool(Tool, Exporter):
     def process_data_for_makefile(self, project_data):
         #Flatten our dictionary, we don't need groups
         for key in SOURCE_KEYS:
-            project_data[key] = list(chain(*project_data[key].values()))
+            project_data[key] = chain_paths(project_data[key].values())
         self._get_libs(project_data)
         self._parse_specific_options(project_data)
 
 
-        pro_def = ProGenDef()
+        pro_def = get_definitions()
 
         if pro_def.get_mcu_core(project_data['target'].lower()):
             project_data['core'] = pro_def.get_mcu_core(project_data['target'].lower())[0]
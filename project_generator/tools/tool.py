@@ -13,22 +13,144 @@
 # limitations under the License.
 
 import os
+import sys
+import json
+import compileall
+import hashlib
 import logging
+import threading
+import xmltodict
 from collections import OrderedDict
 
 from os.path import join, dirname, abspath, normpath
-from jinja2 import Template, FileSystemLoader
+from jinja2 import __version__ as jinja2_version
+from jinja2 import Template, FileSystemLoader, FileSystemBytecodeCache, ModuleLoader, ChoiceLoader, TemplateNotFound
 from jinja2.environment import Environment
 
-from ..util import SOURCE_KEYS
+from ..cache import open_atomic
+from ..util import get_file_groups
+from ..export_data import ExportData
 
 logger = logging.getLogger('progen.tools')
 
+# (template dir, bytecode dir, compiled dir) -> Environment, shared by all exporters
+_environments = {}
+_environments_lock = threading.Lock()
+
+# index of precompiled templates, versions which compiled them and names to digests
+# of their sources
+COMPILED_INDEX = 'index.json'
+
+def _source_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _compiler_versions():
+    """ Modules of compiled templates can be loaded only by the same jinja2 and python """
+    return {'jinja2': jinja2_version, 'python': '%d.%d' % sys.version_info[:2]}
+
+def compile_templates(template_dir, target):
+    """ Compiles jinja2 templates (*.tmpl) of template_dir to python modules in target
+
+    This is a build step (setup.py build_py), get_environment loads the modules
+    instead of compiling templates. For a source checkout:
+
+        python -c "from project_generator.tools.tool import Exporter, compile_templates; \\
+            compile_templates(Exporter.TEMPLATE_DIR, Exporter.COMPILED_TEMPLATE_DIR)"
+    """
+    names = sorted([name for name in os.listdir(template_dir) if name.endswith('.tmpl')])
+    env = Environment(loader=FileSystemLoader(template_dir))
+    env.compile_templates(target, zip=None, filter_func=lambda name: name in names,
+        ignore_errors=False)
+    # modules are imported from bytecode, python does not compile them either
+    compileall.compile_dir(target, quiet=1)
+    index = _compiler_versions()
+    index['templates'] = dict([(name, _source_digest(join(template_dir, name))) for name in names])
+    with open(join(target, COMPILED_INDEX), 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return names
+
+class CompiledTemplateLoader(ModuleLoader):
+    """ Precompiled templates (compile_templates) which match their sources
+
+    A template which is not in the index, or whose source changed since it was
+    compiled, is not found, ChoiceLoader takes it from the source then. As with
+    FileSystemLoader, a loaded template is up to date while the mtime of its
+    source does not change. Raises ValueError if the templates were compiled by
+    another jinja2 or python version.
+    """
+
+    def __init__(self, path, template_dir):
+        ModuleLoader.__init__(self, path)
+        self.template_dir = template_dir
+        with open(join(path, COMPILED_INDEX)) as f:
+            index = json.load(f)
+        versions = _compiler_versions()
+        if any([index.get(key) != version for key, version in versions.items()]):
+            raise ValueError("Templates in %s were compiled by %s" % (path,
+                ', '.join(['%s %s' % (key, index.get(key)) for key in sorted(versions)])))
+        self.index = index['templates']
+
+    def load(self, environment, name, globals=None):
+        source = join(self.template_dir, name)
+        try:
+            mtime = os.path.getmtime(source)
+            matches = self.index.get(name) == _source_digest(source)
+        except (IOError, OSError):
+            matches = False
+        if not matches:
+            raise TemplateNotFound(name)
+        template = ModuleLoader.load(self, environment, name, globals)
+
+        # ModuleLoader templates are never out of date, the source is checked instead
+        def uptodate():
+            try:
+                return os.path.getmtime(source) == mtime
+            except OSError:
+                return False
+        template._uptodate = uptodate
+        return template
+
+def get_environment(template_dir, bytecode_dir=None, compiled_dir=None):
+    """ Jinja2 environment for templates in template_dir
+
+    One environment is shared by all exporters of the process, a template is
+    loaded and compiled once, it's kept in the environment cache. It's reloaded
+    if the file changes. With bytecode_dir, compiled templates are stored there
+    and the next run does not compile them again.
+
+    Templates precompiled to compiled_dir (compile_templates) are not compiled
+    at all. Templates which are not there, or changed since, come from sources.
+    """
+    with _environments_lock:
+        key = (template_dir, bytecode_dir, compiled_dir)
+        try:
+            return _environments[key]
+        except KeyError:
+            pass
+        bytecode_cache = None
+        if bytecode_dir:
+            try:
+                if not os.path.isdir(bytecode_dir):
+                    os.makedirs(bytecode_dir)
+                bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+            except OSError:
+                logger.debug("Can't use template cache %s" % bytecode_dir)
+        loader = FileSystemLoader(template_dir)
+        if compiled_dir and os.path.isfile(join(compiled_dir, COMPILED_INDEX)):
+            try:
+                loader = ChoiceLoader([CompiledTemplateLoader(compiled_dir, template_dir), loader])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug("Precompiled templates are not used: %s" % e)
+        # TODO: undefined=StrictUndefined - this needs fixes in templates
+        env = _environments[key] = Environment(loader=loader, bytecode_cache=bytecode_cache)
+        return env
+
 
 def get_tool_template():
     """ Internal project data
 
-    a dict with the following keys is returned:
+    ExportData with the following keys is returned:
     source_paths - a list of source paths derived from s
     include_paths - a list of include paths derived from sources
     include_files - a dict of include files used in the copy function mapping
@@ -50,6 +172,8 @@ def get_tool_template():
       rel_path - the relative path to the root
       rel_count - the number of steps to the root
     macros - a list of c pre-processor macros
+    file_groups - a dict of groups to lists of sources and includes within each
+                  group, sorted by file names, see get_file_groups
     template - a filename of an external template file
     misc - a dict of miscellaneous tool options
 
@@ -74,7 +198,7 @@ def get_tool_template():
         "template": None,
         "misc": {}
     }
-    return internal_template
+    return ExportData(internal_template)
 
 
 # Each new tool should at least support this Tool class methods
@@ -106,6 +230,10 @@ class Exporter(object):
     """Just an exporter template for subclassing"""
 
     TEMPLATE_DIR = abspath(join(dirname(__file__), '..', 'templates'))
+    # bundled templates precompiled by the build, see compile_templates
+    COMPILED_TEMPLATE_DIR = join(TEMPLATE_DIR, 'compiled')
+    # rendered pieces joined for a write to the output file
+    RENDER_BUFFER = 256
 
     # Any tool which exports should implement these methods 3 methods
     def export_workspace(self):
@@ -137,6 +265,17 @@ class Exporter(object):
         open(output, "w").write(target_text)
         return dirname(output), output
 
+    def gen_file_xml(self, xml_dic, output, dest_path, **kwargs):
+        """ Writes xmltodict data as it's unparsed, kwargs are passed to unparse """
+        if not os.path.exists(dest_path):
+            os.makedirs(dest_path)
+        output = join(dest_path, output)
+        logger.debug("Generating: %s" % output)
+
+        with open_atomic(output, "w") as f:
+            xmltodict.unparse(xml_dic, output=f, **kwargs)
+        return dirname(output), output
+
     def gen_file_jinja(self, template_file, data, output, dest_path):
         if not os.path.exists(dest_path):
             os.makedirs(dest_path)
@@ -144,15 +283,24 @@ class Exporter(object):
         logger.debug("Generating: %s" % output)
 
         """ Fills data to the project template, using jinja2. """
-        env = Environment()
-        env.loader = FileSystemLoader(self.TEMPLATE_DIR)
-        # TODO: undefined=StrictUndefined - this needs fixes in templates
-        template = env.get_template(template_file)
-        target_text = template.render(data)
-
-        open(output, "w").write(target_text)
+        template = self._get_environment().get_template(template_file)
+        # the output is written as it's rendered, it's not kept in memory. The stream
+        # joins pieces, a write per piece would be slower than render(). A template
+        # error leaves the previous output, not a truncated one
+        stream = template.stream(data)
+        stream.enable_buffering(self.RENDER_BUFFER)
+        with open_atomic(output, "w") as f:
+            stream.dump(f)
         return dirname(output), output
 
+    def _get_environment(self):
+        """ The shared environment, with the bytecode cache if settings enable it """
+        settings = getattr(self, 'env_settings', None)
+        bytecode_dir = None
+        if settings is not None and settings.template_cache and settings.cache:
+            bytecode_dir = join(settings.cache_dir, 'templates')
+        return get_environment(self.TEMPLATE_DIR, bytecode_dir, self.COMPILED_TEMPLATE_DIR)
+
     def fixup_executable(self, exe_path):
         return exe_path
 
@@ -170,42 +318,20 @@ class Exporter(object):
                                                                            new_data, extension))
                 else:
                     logger.debug("Filetype for file %s not recognized" % file)
-        if hasattr(self, '_expand_sort_key'):
-            new_data['groups'][group] = sorted(new_data['groups'][group],
-                                               key=self._expand_sort_key)
+
+    def _get_file_groups(self, data):
+        """ Files of each group sorted, see get_file_groups """
+        if 'file_groups' in data:
+            return data['file_groups']
+        return get_file_groups(data)
 
     def _get_groups(self, data):
         """ Get all groups defined """
-        groups = []
-        for attribute in SOURCE_KEYS:
-            for k, v in data[attribute].items():
-                if k == None:
-                    k = 'Sources'
-                if k not in groups:
-                    groups.append(k)
-        for k, v in data['include_files'].items():
-            if k == None:
-                k = 'Includes'
-            if k not in groups:
-                groups.append(k)
-        return groups
+        return list(self._get_file_groups(data).keys())
 
     def _iterate(self, data, expanded_data):
         """ _Iterate through all data, store the result expansion in extended dictionary """
-        for attribute in SOURCE_KEYS:
-            for k, v in data[attribute].items():
-                if k == None:
-                    group = 'Sources'
-                else:
-                    group = k
-                if group in data[attribute].keys():
-                    self._expand_data(data[attribute][group], expanded_data, group)
-        for k, v in data['include_files'].items():
-            if k == None:
-                group = 'Includes'
-            else:
-                group = k
-            self._expand_data(data['include_files'][group], expanded_data, group)
-
-        # sort groups
+        for group, files in self._get_file_groups(data).items():
+            self._expand_data(files, expanded_data, group)
+
         expanded_data['groups'] = OrderedDict(sorted(expanded_data['groups'].items(), key=lambda t: t[0]))
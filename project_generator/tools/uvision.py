@@ -24,7 +24,7 @@ from codecs import open
 from os import getcwd
 from os.path import basename, join, normpath
 from collections import OrderedDict
-from project_generator_definitions.definitions import ProGenDef
+from ..definitions import get_definitions
 
 from .tool import Tool, Builder, Exporter
 from ..util import SOURCE_KEYS
@@ -284,14 +284,13 @@ class Uvision(Tool, Builder, Exporter):
             # group['Files'] = {}
             group['Files'] = {'File': []}
             uvproj_dic['Project']['Targets']['Target']['Groups']['Group'].append(group)
+            # files are sorted, see get_file_groups
             for file in files:
                 uvproj_dic['Project']['Targets']['Target']['Groups']['Group'][i]['Files']['File'].append(file)
-            files = uvproj_dic['Project']['Targets']['Target']['Groups']['Group'][i]['Files']['File']
-            uvproj_dic['Project']['Targets']['Target']['Groups']['Group'][i]['Files']['File'] = sorted(files, key=lambda x: x['FileName'].lower())
             i += 1
 
     def _generate_uvmpw_file(self):
-        uvmpw_dic = xmltodict.parse(open(self.uvmpw_file))
+        uvmpw_dic = xmltodict.parse(open(self.uvmpw_file, "rb"))
         uvmpw_dic['ProjectWorkspace']['project'] = []
 
         for project in self.workspace['projects']:
@@ -310,7 +309,7 @@ class Uvision(Tool, Builder, Exporter):
         return project_path, uvmpw
 
     def _set_target(self, expanded_dic, uvproj_dic, tool_name):
-        pro_def = ProGenDef(tool_name)
+        pro_def = get_definitions(tool_name)
         if not pro_def.is_supported(expanded_dic['target'].lower()):
             raise RuntimeError("Target %s is not supported. Please add them to https://github.com/project-generator/project_generator_definitions" % expanded_dic['target'].lower())
         mcu_def_dic = pro_def.get_tool_definition(expanded_dic['target'].lower())
@@ -345,7 +344,7 @@ class Uvision(Tool, Builder, Exporter):
             uvproj_dic['Project']['Targets']['Target']['TargetOption']['TargetCommonOption']['PackID'] = mcu_def_dic['TargetOption']['PackID'][0]
 
     def _uvoptx_set_debugger(self, expanded_dic, uvoptx_dic, tool_name):
-        pro_def = ProGenDef(tool_name)
+        pro_def = get_definitions(tool_name)
         if not pro_def.is_supported(expanded_dic['target'].lower()):
             raise RuntimeError("Target %s is not supported. Please add them to https://github.com/project-generator/project_generator_definitions" % expanded_dic['target'].lower())
         mcu_def_dic = pro_def.get_tool_definition(expanded_dic['target'].lower())
@@ -400,7 +399,7 @@ class Uvision(Tool, Builder, Exporter):
                         return None, None
                 else:
                     logger.info("Template file %s contains unknown template extension (.uvproj/x are valid). Using default one" % template)
-                    uvproj_dic = xmltodict.parse(open(self.uvproj_file))
+                    uvproj_dic = xmltodict.parse(open(self.uvproj_file, "rb"))
         elif 'uvision' in self.env_settings.templates.keys():
             # template overrides what is set in the yaml files
             for template in self.env_settings.templates['uvision']:
@@ -411,12 +410,12 @@ class Uvision(Tool, Builder, Exporter):
                         uvproj_dic = xmltodict.parse(open(template, encoding="utf8").read())
                     except IOError:
                         logger.info("Template file %s not found. Using default template" % template)
-                        uvproj_dic = xmltodict.parse(open(self.uvproj_file))
+                        uvproj_dic = xmltodict.parse(open(self.uvproj_file, "rb"))
                 else:
                     logger.info("Template file %s contains unknown template extension (.uvproj/x are valid). Using default one" % template)
-                    uvproj_dic = xmltodict.parse(open(self.uvproj_file))
+                    uvproj_dic = xmltodict.parse(open(self.uvproj_file, "rb"))
         else:
-            uvproj_dic = xmltodict.parse(open(self.uvproj_file))
+            uvproj_dic = xmltodict.parse(open(self.uvproj_file, "rb"))
 
         try:
             uvproj_dic['Project']['Targets']['Target']['TargetName'] = expanded_dic['name']
@@ -456,14 +455,14 @@ class Uvision(Tool, Builder, Exporter):
             except KeyError:
                 raise RuntimeError("Debugger %s is not supported" % expanded_dic['debugger'])
 
-        # Project file
-        uvproj_xml = xmltodict.unparse(uvproj_dic, pretty=True)
-        project_path, uvproj = self.gen_file_raw(uvproj_xml, '%s.%s' % (expanded_dic['name'], extension), expanded_dic['output_dir']['path'])
+        # Project file, it lists all files, it's written as it's unparsed
+        project_path, uvproj = self.gen_file_xml(uvproj_dic, '%s.%s' % (expanded_dic['name'], extension),
+            expanded_dic['output_dir']['path'], pretty=True)
 
         uvoptx = None
 
         # generic tool template specified
-        uvoptx_dic = xmltodict.parse(open(self.uvoptx_file))
+        uvoptx_dic = xmltodict.parse(open(self.uvoptx_file, "rb"))
 
         self._uvoptx_set_debugger(expanded_dic, uvoptx_dic, tool_name)
 
@@ -19,6 +19,18 @@ import string
 import operator
 
 from functools import reduce
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from .paths import chain_paths
+
+# libyaml based loader/dumper are much faster, use them if PyYAML was built with libyaml
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+    YAML_BACKEND = 'libyaml'
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+    YAML_BACKEND = 'python'
 
 FILES_EXTENSIONS = {
     'include_files': ['h', 'hpp', 'inc'],
@@ -41,6 +53,31 @@ FILE_MAP = {v:k for k,values in FILES_EXTENSIONS.items() for v in values}
 SOURCE_KEYS = ['source_files_c', 'source_files_s', 'source_files_cpp', 'source_files_lib', 'source_files_obj']
 VALID_EXTENSIONS = reduce(lambda x,y:x+y,[FILES_EXTENSIONS[key] for key in SOURCE_KEYS])
 
+def file_sort_key(path):
+    """ Files in a group are sorted by their names, case insensitive """
+    return os.path.basename(path).lower()
+
+def get_file_groups(project_data):
+    """ Sources and includes of each group in one list, sorted by file_sort_key
+
+    Groups are sorted by their names, the group None (files without a group)
+    is the first. Files with the same key keep the order of the keys, as they
+    did when uvision, IAR, eclipse and coide sorted groups themselves. These
+    exporters take files of a group in this order.
+    Streamed sources (PathStream) are not sorted, files of a group with
+    streamed sources are chained in the order of the keys.
+    """
+    groups = {}
+    for key in SOURCE_KEYS + ['include_files']:
+        for group, files in project_data[key].items():
+            groups.setdefault(group, []).append(files)
+    for group, files in groups.items():
+        groups[group] = chain_paths(files)
+        # sources are sorted already, the sort mostly merges sorted runs
+        if type(groups[group]) is list:
+            groups[group].sort(key=file_sort_key)
+    return OrderedDict(sorted(groups.items(), key=lambda t: (t[0] is not None, t[0])))
+
 def rmtree_if_exists(directory):
     if os.path.exists(directory):
         shutil.rmtree(directory)
@@ -49,6 +86,33 @@ def uniqify(_list):
     # see: http://stackoverflow.com/questions/480214/how-do-you-remove-duplicates-from-a-list-in-python-whilst-preserving-order/29898968#29898968
     return reduce(lambda r, v: v in r[1] and r or (r[0].append(v) or r[1].add(v)) or r, _list, ([], set()))[0]
 
+class OrderedSet(object):
+    """ Set which keeps insertion order, a path added again stays where it was """
+
+    def __init__(self, items=None):
+        self._items = OrderedDict()
+        if items:
+            self.update(items)
+
+    def add(self, item):
+        self._items[item] = None
+
+    def update(self, items):
+        for item in items:
+            self._items[item] = None
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return 'OrderedSet(%r)' % list(self._items)
+
 def merge_recursive(*args):
     if all(isinstance(x, dict) for x in args):
         output = {}
@@ -69,15 +133,37 @@ def flatten(S):
         return flatten(S[0]) + flatten(S[1:])
     return S[:1] + flatten(S[1:])
 
-def load_yaml_records(yaml_files):
-    dictionaries = []
-    for yaml_file in yaml_files:
+def load_yaml(stream):
+    """ Parse yaml (a string or a file), only standard yaml tags are constructed """
+    return yaml.load(stream, Loader=YamlLoader)
+
+def dump_yaml(data, stream=None, **kwargs):
+    """ Serialize data to yaml, returns a string if stream is not provided """
+    return yaml.dump(data, stream, Dumper=YamlDumper, **kwargs)
+
+def load_yaml_records(yaml_files, cache=None, jobs=1):
+    """ Parse yaml records, cache (RecordCache) serves already parsed records
+
+    With jobs > 1, records are read by a pool of threads. The order of
+    the returned records is always the order of yaml_files.
+    """
+    def load(yaml_file):
         try:
-            f = open(yaml_file, 'rt')
-            dictionaries.append(yaml.load(f))
-        except IOError:
+            if cache:
+                return cache.load(yaml_file)
+            with open(yaml_file, 'rt') as f:
+                return load_yaml(f)
+        except (IOError, OSError):
            raise IOError("The file %s referenced in main yaml doesn't exist." % yaml_file)
-    return dictionaries
+
+    if jobs > 1 and len(yaml_files) > 1:
+        pool = ThreadPool(min(jobs, len(yaml_files)))
+        try:
+            return pool.map(load, yaml_files)
+        finally:
+            pool.close()
+            pool.join()
+    return [load(yaml_file) for yaml_file in yaml_files]
 
 class PartialFormatter(string.Formatter):
     def get_field(self, field_name, args, kwargs):
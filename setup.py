@@ -17,12 +17,28 @@ import pip
 
 from pip.req import parse_requirements
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 
 def read(fname):
     return open(os.path.join(os.path.dirname(__file__), fname)).read()
 
 requirements = [str(requirement.req) for requirement in parse_requirements('requirements.txt', session=pip.download.PipSession())]
 
+class BuildPyCommand(build_py):
+    """ Bundled templates are precompiled to python modules, progen does not compile them """
+
+    def run(self):
+        build_py.run(self)
+        try:
+            from project_generator.tools.tool import Exporter, compile_templates
+        except ImportError as e:
+            # templates are compiled when they are used
+            self.warn("templates are not precompiled, %s" % e)
+            return
+        target = os.path.join(self.build_lib, 'project_generator', 'templates', 'compiled')
+        self.mkpath(target)
+        compile_templates(Exporter.TEMPLATE_DIR, target)
+
 setup(
     name='project_generator',
     version='0.9.9',
@@ -50,4 +66,5 @@ setup(
 
     install_requires = requirements,
     include_package_data = True,
+    cmdclass={'build_py': BuildPyCommand},
 )
@@ -0,0 +1,136 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import pickle
+import shutil
+import datetime
+
+import yaml
+from unittest import TestCase
+
+from project_generator.cache import RecordCache, open_atomic, write_atomic
+from project_generator.util import load_yaml_records
+
+project_1_yaml = {
+    'common': {
+        'sources': ['test_workspace/main.cpp'],
+        'macros': ['MACRO1'],
+    }
+}
+
+class TestRecordCache(TestCase):
+
+    """test things related to the RecordCache class"""
+
+    def setUp(self):
+        if not os.path.exists('test_workspace'):
+            os.makedirs('test_workspace')
+        self.record = os.path.join('test_workspace', 'project_1.yaml')
+        with open(self.record, 'wt') as f:
+            f.write(yaml.dump(project_1_yaml, default_flow_style=False))
+        self.cache = RecordCache(os.path.join('test_workspace', 'cache'))
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_hit_miss(self):
+        assert load_yaml_records([self.record], self.cache) == [project_1_yaml]
+        assert self.cache.misses == 1 and self.cache.hits == 0
+        # a new instance reads the persisted entry
+        cache = RecordCache(os.path.join('test_workspace', 'cache'))
+        assert load_yaml_records([self.record], cache) == [project_1_yaml]
+        assert cache.misses == 0 and cache.hits == 1
+
+    def test_touched_unchanged(self):
+        self.cache.load(self.record)
+        stat = os.stat(self.record)
+        os.utime(self.record, (stat.st_atime, stat.st_mtime + 10))
+        cache = RecordCache(os.path.join('test_workspace', 'cache'))
+        assert cache.load(self.record) == project_1_yaml
+        assert cache.hits == 1
+
+    def test_changed(self):
+        self.cache.load(self.record)
+        with open(self.record, 'wt') as f:
+            f.write(yaml.dump({'common': {'macros': ['MACRO2']}}, default_flow_style=False))
+        stat = os.stat(self.record)
+        os.utime(self.record, (stat.st_atime, stat.st_mtime + 10))
+        cache = RecordCache(os.path.join('test_workspace', 'cache'))
+        assert cache.load(self.record) == {'common': {'macros': ['MACRO2']}}
+        assert cache.misses == 1
+
+    def test_memo(self):
+        first = self.cache.load(self.record)
+        second = self.cache.load(self.record)
+        assert self.cache.misses == 1 and self.cache.hits == 0 and self.cache.memo_hits == 1
+        # each caller gets own copy
+        first['common']['macros'].append('MACRO2')
+        assert second == project_1_yaml
+        assert self.cache.load(self.record) == project_1_yaml
+
+    def test_disabled(self):
+        cache = RecordCache(os.path.join('test_workspace', 'cache'), False)
+        assert cache.load(self.record) == project_1_yaml
+        assert not os.path.exists(os.path.join('test_workspace', 'cache'))
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            load_yaml_records([os.path.join('test_workspace', 'missing.yaml')], self.cache)
+
+    def test_pickled_entry(self):
+        # entries are not unpickled, a pickled one is invalid and rewritten
+        write_atomic(self.cache._entry_path(self.record), pickle.dumps({'version': RecordCache.VERSION}))
+        assert self.cache.load(self.record) == project_1_yaml
+        assert self.cache.misses == 1
+        cache = RecordCache(os.path.join('test_workspace', 'cache'))
+        assert cache.load(self.record) == project_1_yaml and cache.hits == 1
+
+    def test_not_marshallable(self):
+        # yaml timestamps are kept in memory only
+        with open(self.record, 'wt') as f:
+            f.write('common:\n    date: 2015-01-01\n')
+        assert self.cache.load(self.record) == {'common': {'date': datetime.date(2015, 1, 1)}}
+        assert self.cache.load(self.record) == {'common': {'date': datetime.date(2015, 1, 1)}}
+        assert not os.path.exists(self.cache._entry_path(self.record))
+
+class TestOpenAtomic(TestCase):
+
+    """test things related to open_atomic"""
+
+    def setUp(self):
+        if not os.path.exists('test_workspace'):
+            os.makedirs('test_workspace')
+        self.path = os.path.join('test_workspace', 'output')
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_mode(self):
+        # a replaced file keeps its permissions
+        write_atomic(self.path, b'first')
+        os.chmod(self.path, 0o600)
+        mode = os.stat(self.path).st_mode
+        write_atomic(self.path, b'second')
+        assert os.stat(self.path).st_mode == mode
+        with open(self.path, 'rb') as f:
+            assert f.read() == b'second'
+
+    def test_open_error(self):
+        # the error of opening the temporary file is raised, not one of the cleanup
+        with self.assertRaises(ValueError):
+            with open_atomic(self.path, 'invalid mode'):
+                pass
+        assert os.listdir('test_workspace') == []
@@ -14,12 +14,16 @@
 
 import argparse
 import os
+import time
 import yaml
 import shutil
 
 from unittest import TestCase
 
+from project_generator.cache import load_data
 from project_generator.commands import generate
+from project_generator.manifest import Manifest
+from project_generator.settings import ProjectSettings
 from .simple_project import project_1_yaml, projects_yaml, project_2_yaml
 
 class TestExportCommand(TestCase):
@@ -159,3 +163,129 @@ class TestExportCommand(TestCase):
         result = generate.run(args)
 
         assert result == 0
+
+    def test_generate_unchanged_skipped(self):
+        generate.setup(self.subparser)
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml','-p','project_2',
+            '-t', 'make_gcc_arm'])
+        assert generate.run(args) == 0
+        makefile = 'generated_projects/make_gcc_arm_project_2/Makefile'
+        with open(makefile, 'a') as f:
+            f.write('# not generated')
+
+        # inputs did not change, the makefile is kept
+        assert generate.run(args) == 0
+        with open(makefile) as f:
+            assert f.read().endswith('# not generated')
+
+        # forced
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml','-p','project_2',
+            '-t', 'make_gcc_arm', '--force'])
+        assert generate.run(args) == 0
+        with open(makefile) as f:
+            assert not f.read().endswith('# not generated')
+
+    def test_generate_changed_regenerated(self):
+        generate.setup(self.subparser)
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml','-p','project_2',
+            '-t', 'make_gcc_arm'])
+        assert generate.run(args) == 0
+        makefile = 'generated_projects/make_gcc_arm_project_2/Makefile'
+        with open(makefile, 'a') as f:
+            f.write('# not generated')
+
+        project_2 = dict(project_2_yaml, common=dict(project_2_yaml['common'], macros=['NEW_MACRO']))
+        with open(os.path.join(os.getcwd(), 'test_workspace/project_2.yaml'), 'wt') as f:
+            f.write(yaml.dump(project_2, default_flow_style=False))
+        assert generate.run(args) == 0
+        with open(makefile) as f:
+            content = f.read()
+        assert 'NEW_MACRO' in content and not content.endswith('# not generated')
+
+    def test_generate_shards(self):
+        generate.setup(self.subparser)
+        for shard in ['1/2', '2/2']:
+            args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml',
+                '-t', 'make_gcc_arm', '--shard', shard])
+            generate.run(args)
+        assert os.path.isfile('generated_projects/make_gcc_arm_project_2/Makefile')
+        assert os.path.isfile('generated_projects/make_gcc_arm_project_3/Makefile')
+
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['generate', '--shard', '3/2'])
+
+    def test_generate_shards_differing_manifests(self):
+        # runners of the shards have different local manifests, the shards still
+        # partition the projects
+        # without workspaces, members of a workspace are generated with the workspace
+        with open('test_workspace/shards.yaml', 'wt') as f:
+            f.write(yaml.dump({'projects': projects_yaml['projects']}, default_flow_style=False))
+        generate.setup(self.subparser)
+        generated = []
+        for shard, costs in [('1/2', {'project_2': 100, 'project_3': 1}),
+                             ('2/2', {'project_2': 1, 'project_3': 100})]:
+            manifest = Manifest(ProjectSettings().cache_dir)
+            manifest.entries = {}
+            for project, sources in costs.items():
+                manifest.update(project, 'make_gcc_arm', 'digest', [], sources)
+            manifest.save()
+            args = self.parser.parse_args(['generate','-f','test_workspace/shards.yaml',
+                '-t', 'make_gcc_arm', '--shard', shard, '--force'])
+            assert generate.run(args) == 0
+            generated += os.listdir('generated_projects') if os.path.exists('generated_projects') else []
+            shutil.rmtree('generated_projects', ignore_errors=True)
+        assert sorted(generated) == ['make_gcc_arm_project_2', 'make_gcc_arm_project_3']
+
+        # the costs file is the same for both
+        with open('test_workspace/costs.yaml', 'wt') as f:
+            f.write(yaml.dump({'project_2': 1, 'project_3': 100}, default_flow_style=False))
+        generated = []
+        for shard in ['1/2', '2/2']:
+            args = self.parser.parse_args(['generate','-f','test_workspace/shards.yaml',
+                '-t', 'make_gcc_arm', '--shard', shard, '--shard-costs', 'test_workspace/costs.yaml', '--force'])
+            assert generate.run(args) == 0
+            generated.append(sorted(os.listdir('generated_projects')))
+            shutil.rmtree('generated_projects', ignore_errors=True)
+        assert generated == [['make_gcc_arm_project_3'], ['make_gcc_arm_project_2']]
+
+        args = self.parser.parse_args(['generate','-f','test_workspace/shards.yaml',
+            '-t', 'make_gcc_arm', '--save-shard-costs', 'test_workspace/saved.yaml'])
+        assert generate.run(args) == 0
+        with open('test_workspace/saved.yaml', 'rt') as f:
+            assert sorted(yaml.safe_load(f)) == ['project_2', 'project_3']
+
+    def test_generate_jobs(self):
+        generate.setup(self.subparser)
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml',
+            '-t', 'make_gcc_arm', '--jobs', '2', '--force'])
+        assert generate.run(args) == 0
+        assert os.path.isfile('generated_projects/make_gcc_arm_project_2/Makefile')
+        assert os.path.isfile('generated_projects/make_gcc_arm_project_3/Makefile')
+
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml',
+            '-p', 'project_4', '--jobs', '2'])
+        assert generate.run(args) == -1
+
+    def test_generate_jobs_fs_index(self):
+        # directories listed by workers are stored in the index
+        os.makedirs('test_workspace/src')
+        os.makedirs('test_workspace/cache')
+        with open(os.path.join(os.getcwd(), 'test_workspace/src/main.cpp'), 'wt') as f:
+            pass
+        project = dict(project_2_yaml, common=dict(project_2_yaml['common'], sources=['test_workspace/src']))
+        with open(os.path.join(os.getcwd(), 'test_workspace/project_src.yaml'), 'wt') as f:
+            f.write(yaml.dump(project, default_flow_style=False))
+        with open(os.path.join(os.getcwd(), 'test_workspace/index.yaml'), 'wt') as f:
+            f.write(yaml.dump({'projects': {'project_1': ['test_workspace/project_src.yaml'],
+                'project_2': ['test_workspace/project_src.yaml']}, 'settings': {'fs_index': [True],
+                'cache_dir': ['test_workspace/cache']}}, default_flow_style=False))
+        # directories modified just now are not indexed
+        past = time.time() - 60
+        os.utime('test_workspace/src', (past, past))
+        generate.setup(self.subparser)
+        args = self.parser.parse_args(['generate','-f','test_workspace/index.yaml',
+            '-t', 'make_gcc_arm', '--jobs', '2', '--force'])
+        assert generate.run(args) == 0
+        with open('test_workspace/cache/fs_index', 'rb') as f:
+            index = load_data(f.read())
+        assert os.path.abspath('test_workspace/src') in index['directories']
@@ -65,3 +65,11 @@ class TestListCommand(TestCase):
         result = list_projects.run(args)
 
         assert result == 0
+
+    def test_list_projects_file(self):
+        # records referenced by projects.yaml don't exist, they should not be loaded
+        list_projects.setup(self.subparser)
+        args = self.parser.parse_args(['list','projects','-f','test_workspace/projects.yaml'])
+        result = list_projects.run(args)
+
+        assert result == 0
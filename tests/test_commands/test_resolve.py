@@ -0,0 +1,151 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import yaml
+import shutil
+
+from unittest import TestCase
+
+from project_generator.commands import generate, resolve
+from project_generator.lock import ProjectLock
+from project_generator.settings import ProjectSettings
+from .simple_project import project_1_yaml, projects_yaml, project_2_yaml
+
+class TestResolveCommand(TestCase):
+
+    """test resolve command and generating from a lock"""
+
+    def setUp(self):
+        if not os.path.exists('test_workspace'):
+            os.makedirs('test_workspace')
+        # write project file
+        with open(os.path.join(os.getcwd(), 'test_workspace/project_1.yaml'), 'wt') as f:
+            f.write(yaml.dump(project_1_yaml, default_flow_style=False))
+        # write project file
+        with open(os.path.join(os.getcwd(), 'test_workspace/project_2.yaml'), 'wt') as f:
+            f.write(yaml.dump(project_2_yaml, default_flow_style=False))
+        # write projects file
+        with open(os.path.join(os.getcwd(), 'test_workspace/projects.yaml'), 'wt') as f:
+            f.write(yaml.dump(projects_yaml, default_flow_style=False))
+
+        self.parser = argparse.ArgumentParser()
+        subparsers = self.parser.add_subparsers(help='commands')
+        generate.setup(subparsers.add_parser('generate', help=generate.help))
+        resolve.setup(subparsers.add_parser('resolve', help=resolve.help))
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+        shutil.rmtree('generated_projects', ignore_errors=True)
+
+    def test_generate_from_lock(self):
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml','-p','project_2',
+            '-t', 'make_gcc_arm', '--force'])
+        assert generate.run(args) == 0
+        with open('generated_projects/make_gcc_arm_project_2/Makefile') as f:
+            makefile = f.read()
+        shutil.rmtree('generated_projects')
+
+        args = self.parser.parse_args(['resolve','-f','test_workspace/projects.yaml',
+            '-t', 'make_gcc_arm', '-o', 'test_workspace/projects.lock'])
+        assert resolve.run(args) == 0
+        assert ProjectLock.load('test_workspace/projects.lock').projects() == ['project_2', 'project_3']
+
+        # records are not needed anymore
+        os.remove('test_workspace/project_2.yaml')
+        args = self.parser.parse_args(['generate','-f','test_workspace/projects.yaml','-p','project_2',
+            '--from-lock', 'test_workspace/projects.lock', '--force'])
+        assert generate.run(args) == 0
+        with open('generated_projects/make_gcc_arm_project_2/Makefile') as f:
+            assert f.read() == makefile
+
+    def test_generate_only_lock(self):
+        args = self.parser.parse_args(['resolve','-f','test_workspace/projects.yaml',
+            '-t', 'make_gcc_arm', '-o', 'test_workspace/lock/projects.lock'])
+        assert resolve.run(args) == 0
+
+        # a directory without projects.yaml
+        cwd = os.getcwd()
+        os.chdir('test_workspace/lock')
+        try:
+            args = self.parser.parse_args(['generate', '--from-lock', 'projects.lock', '--force'])
+            assert args.file is None
+            assert generate.run(args) == 0
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree('test_workspace/lock/.progen', ignore_errors=True)
+        # paths in the lock are relative to the directory where it was resolved
+        assert os.path.isfile('test_workspace/lock/generated_projects/make_gcc_arm_project_2/Makefile')
+
+        args = self.parser.parse_args(['generate'])
+        os.chdir('test_workspace/lock')
+        try:
+            assert generate.run(args) == -1
+        finally:
+            os.chdir(cwd)
+
+    def test_lock_format(self):
+        args = self.parser.parse_args(['resolve','-f','test_workspace/projects.yaml',
+            '-t', 'make_gcc_arm', '-o', 'test_workspace/projects.lock'])
+        assert resolve.run(args) == 0
+        # json, not executable
+        with open('test_workspace/projects.lock', 'rt') as f:
+            lock = json.load(f)
+        assert lock['version'] == ProjectLock.VERSION
+        resolved = ProjectLock.load('test_workspace/projects.lock').resolved
+        assert [(name, tool) for name, tool, data in resolved] == [('project_2', 'make_gcc_arm'),
+            ('project_3', 'make_gcc_arm')]
+        assert resolved[0][2]['name'] == 'project_2'
+
+        lock['version'] = ProjectLock.VERSION - 1
+        with open('test_workspace/projects.lock', 'wt') as f:
+            json.dump(lock, f)
+        with self.assertRaises(RuntimeError):
+            ProjectLock.load('test_workspace/projects.lock')
+
+    def test_invalid_lock(self):
+        with open('test_workspace/projects.lock', 'wt') as f:
+            f.write('not a lock')
+        with self.assertRaises(RuntimeError):
+            ProjectLock.load('test_workspace/projects.lock')
+        with self.assertRaises(IOError):
+            ProjectLock.load('test_workspace/missing.lock')
+
+    def test_lock_settings(self):
+        args = self.parser.parse_args(['resolve','-f','test_workspace/projects.yaml',
+            '-t', 'make_gcc_arm', '-o', 'test_workspace/projects.lock'])
+        environ = dict(os.environ)
+        os.environ['ARM_GCC_PATH'] = '/resolver/gcc'
+        os.environ['PROJECT_GENERATOR_CACHE'] = '1'
+        try:
+            assert resolve.run(args) == 0
+            # settings of the generating process win
+            os.environ['ARM_GCC_PATH'] = '/runner/gcc'
+            os.environ['PROJECT_GENERATOR_CACHE'] = '0'
+            cwd = os.getcwd()
+            os.chdir('test_workspace')
+            try:
+                settings = ProjectLock.load('projects.lock').settings
+            finally:
+                os.chdir(cwd)
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        assert settings.paths['gcc'] == '/runner/gcc'
+        assert not settings.cache
+        assert settings.root == os.path.join(cwd, 'test_workspace')
+        assert settings.export_location_format == ProjectSettings.DEFAULT_EXPORT_LOCATION_FORMAT
@@ -0,0 +1,34 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from project_generator_definitions.definitions import ProGenDef
+from project_generator.definitions import get_definitions
+
+class TestDefinitions(TestCase):
+
+    """test things related to the target definitions cache"""
+
+    def test_same_answers(self):
+        definitions = get_definitions('iar')
+        assert definitions is get_definitions('iar')
+        assert definitions is not get_definitions()
+        pro_def = ProGenDef('iar')
+        assert definitions.is_supported('mbed-lpc1768') == pro_def.is_supported('mbed-lpc1768')
+        assert get_definitions().get_mcu_core('mbed-lpc1768') == ProGenDef().get_mcu_core('mbed-lpc1768')
+
+    def test_copies(self):
+        definition = get_definitions('iar').get_tool_definition('mbed-lpc1768')
+        definition.clear()
+        assert get_definitions('iar').get_tool_definition('mbed-lpc1768')
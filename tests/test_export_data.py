@@ -0,0 +1,103 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import pickle
+
+from unittest import TestCase
+
+from project_generator.export_data import ExportData, ExportView
+from project_generator.tools.tool import get_tool_template
+from project_generator.util import dump_yaml, load_yaml
+
+class TestExportData(TestCase):
+
+    """test things related to the ExportData class"""
+
+    def setUp(self):
+        self.data = get_tool_template()
+        self.data['source_files_c'] = {'hal': ['hal.c', 'uart.c']}
+        self.data['name'] = 'project_1'
+
+    def test_dict_view(self):
+        assert isinstance(self.data, ExportData)
+        assert self.data['name'] == 'project_1'
+        assert 'target' not in self.data
+        assert self.data.get('target') is None
+        # exporters add their own keys
+        self.data['core'] = 'cortex-m4'
+        assert self.data['core'] == 'cortex-m4' and 'core' in self.data.extras
+        assert set(self.data.keys()) == set(list(get_tool_template().keys()) + ['name', 'core'])
+        del self.data['core']
+        with self.assertRaises(KeyError):
+            self.data['core']
+        assert dict(self.data) == dict(self.data.items())
+
+    def test_copy(self):
+        data = self.data.copy()
+        data['name'] = 'project_2'
+        assert self.data['name'] == 'project_1'
+        # shallow, as dict.copy
+        assert data['output_dir'] is self.data['output_dir']
+        deep = copy.deepcopy(self.data)
+        assert deep == self.data and deep['output_dir'] is not self.data['output_dir']
+        assert pickle.loads(pickle.dumps(self.data, pickle.HIGHEST_PROTOCOL)) == self.data
+
+    def test_compact(self):
+        self.data.compact()
+        assert self.data['source_files_c'] == {'hal': ('hal.c', 'uart.c')}
+        assert load_yaml(dump_yaml(self.data.as_dict()))['source_files_c'] == {'hal': ['hal.c', 'uart.c']}
+        # files of an exporter's view are modified as lists, the data are not changed
+        view = self.data.view()
+        view['source_files_c']['hal'].append('spi.c')
+        view['source_files_c']['hal'].sort(reverse=True)
+        assert view['source_files_c']['hal'] == ['uart.c', 'spi.c', 'hal.c']
+        assert self.data['source_files_c'] == {'hal': ('hal.c', 'uart.c')}
+
+    def test_lazy(self):
+        loaded = []
+        def load(data):
+            loaded.append(data['source_files_c'])
+            data['source_files_c'] = {'app': ['main.c']}
+            data['file_groups'] = {'app': ['main.c']}
+        self.data.set_lazy(['source_files_c', 'file_groups'], load)
+        assert 'file_groups' in self.data and 'file_groups' in list(self.data.keys())
+        assert self.data['name'] == 'project_1' and not loaded
+        view = self.data.view()
+        assert view['file_groups'] == {'app': ['main.c']}
+        # the loader gets the values before loading, it's called once
+        assert loaded == [{'hal': ['hal.c', 'uart.c']}]
+        assert self.data['source_files_c'] == {'app': ['main.c']} and len(loaded) == 1
+        assert view.accessed == set(['file_groups'])
+
+    def test_view(self):
+        view = self.data.view()
+        assert isinstance(view, ExportView) and view == self.data
+        view['name'] = 'project_2'
+        view['output_dir'] = dict(view['output_dir'], rel_path='')
+        view['core'] = 'cortex-m4'
+        del view['macros']
+        assert view['name'] == 'project_2' and view['output_dir']['rel_path'] == '' and view['core'] == 'cortex-m4'
+        # values are read as they are, they are not copied
+        assert view['misc'] is self.data['misc']
+        assert 'macros' not in view and 'macros' not in list(view.keys())
+        # the data below the view are not changed
+        assert self.data['name'] == 'project_1'
+        assert self.data['output_dir'] == get_tool_template()['output_dir']
+        assert 'core' not in self.data and 'macros' in self.data
+        # a copy is a view of the view
+        data = view.copy()
+        data['output_dir'] = dict(data['output_dir'], path='build')
+        assert view['output_dir']['path'] == '' and data['core'] == 'cortex-m4'
+        assert len(data) == len(view) == len(self.data)
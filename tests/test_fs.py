@@ -0,0 +1,122 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+import shutil
+
+from unittest import TestCase
+
+from project_generator.fs import FileSystemSnapshot
+
+class TestFileSystemSnapshot(TestCase):
+
+    """test things related to the FileSystemSnapshot class"""
+
+    def setUp(self):
+        os.makedirs(os.path.join('test_workspace', 'sources', 'hal'))
+        for path in ['main.c', 'header.h', os.path.join('hal', 'hal.c')]:
+            with open(os.path.join('test_workspace', 'sources', path), 'wt') as f:
+                pass
+        self.fs = FileSystemSnapshot()
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_listing(self):
+        sources = os.path.join('test_workspace', 'sources')
+        assert sorted(self.fs.files(sources)) == ['header.h', 'main.c']
+        assert sorted(self.fs.listdir(sources)) == ['hal', 'header.h', 'main.c']
+        # types of entries come with the listing
+        assert self.fs.isdir(os.path.join(sources, 'hal'))
+        assert self.fs.isfile(os.path.join(sources, 'main.c'))
+        assert not self.fs.exists(os.path.join(sources, 'missing.c'))
+        assert self.fs.listings == 1 and self.fs.stats == 0
+
+        assert self.fs.isdir('test_workspace')
+        assert self.fs.isdir('test_workspace')
+        assert self.fs.stats == 1
+
+    def test_case(self):
+        # a case insensitive file system lists the name as it was created
+        class CaseInsensitive(FileSystemSnapshot):
+            def _list(self, path):
+                return [(name.lower(), is_dir, is_file, is_link)
+                    for name, is_dir, is_file, is_link in FileSystemSnapshot._list(self, path)]
+        os.makedirs(os.path.join('test_workspace', 'Src'))
+        fs = CaseInsensitive()
+        assert sorted(fs.listdir('test_workspace')) == ['sources', 'src']
+        assert fs.isdir(os.path.join('test_workspace', 'Src'))
+        assert fs.stats == 1
+        assert not fs.exists(os.path.join('test_workspace', 'SRC', 'missing.c'))
+        # names which don't match any listed name are not stat'ed
+        assert not fs.exists(os.path.join('test_workspace', 'missing'))
+        assert fs.stats == 2
+
+    def test_walk(self):
+        walked = [(path, sorted(dirs), sorted(files)) for path, dirs, files in self.fs.walk('test_workspace')]
+        assert walked == [(path, sorted(dirs), sorted(files)) for path, dirs, files in os.walk('test_workspace')]
+        list(self.fs.walk('test_workspace'))
+        assert self.fs.listings == 3
+        assert list(self.fs.walk('missing')) == []
+
+    def test_invalidate(self):
+        sources = os.path.join('test_workspace', 'sources')
+        assert sorted(self.fs.files(sources)) == ['header.h', 'main.c']
+        with open(os.path.join(sources, 'new.c'), 'wt') as f:
+            pass
+        assert not self.fs.isfile(os.path.join(sources, 'new.c'))
+        self.fs.invalidate(sources)
+        assert self.fs.isfile(os.path.join(sources, 'new.c'))
+        assert sorted(self.fs.files(sources)) == ['header.h', 'main.c', 'new.c']
+
+    def test_not_listable(self):
+        with self.assertRaises(OSError):
+            self.fs.files(os.path.join('test_workspace', 'sources', 'main.c'))
+
+    def test_prefetch(self):
+        sources = os.path.join('test_workspace', 'sources')
+        self.fs.prefetch([os.path.join(sources, 'hal'), sources, os.path.join(sources, 'main.c'),
+            'missing'], 4)
+        assert self.fs.listings == 2 and self.fs.stats == 2
+        assert self.fs.files(os.path.join(sources, 'hal')) == ['hal.c']
+        assert self.fs.isfile(os.path.join(sources, 'main.c'))
+        assert not self.fs.exists('missing')
+        assert self.fs.listings == 2 and self.fs.stats == 2
+
+    def test_index(self):
+        sources = os.path.join('test_workspace', 'sources')
+        index = os.path.join('test_workspace', 'fs_index')
+        # directories modified just now are not indexed, their mtime might not change
+        past = time.time() - 60
+        for path in [sources, os.path.join(sources, 'hal')]:
+            os.utime(path, (past, past))
+        fs = FileSystemSnapshot(index)
+        list(fs.walk(sources))
+        fs.save()
+        assert fs.listings == 2 and os.path.exists(index)
+
+        fs = FileSystemSnapshot(index)
+        assert sorted(fs.files(sources)) == ['header.h', 'main.c']
+        assert fs.isdir(os.path.join(sources, 'hal'))
+        assert fs.listings == 0 and fs.index_hits == 1
+
+        # only the modified directory is listed again
+        with open(os.path.join(sources, 'new.c'), 'wt') as f:
+            pass
+        fs = FileSystemSnapshot(index)
+        fs.prefetch([sources, os.path.join(sources, 'hal')], 2)
+        assert sorted(fs.files(sources)) == ['header.h', 'main.c', 'new.c']
+        assert fs.files(os.path.join(sources, 'hal')) == ['hal.c']
+        assert fs.listings == 1 and fs.index_hits == 1
@@ -18,6 +18,7 @@ import yaml
 from unittest import TestCase
 
 from project_generator.generate import Generator
+from project_generator.project import Project
 
 project_1_yaml = {
     'common': {
@@ -28,7 +29,13 @@ project_1_yaml = {
 
 projects_yaml = {
     'projects': {
-        'project_1' : ['test_workspace/project_1.yaml']
+        'project_1' : ['test_workspace/project_1.yaml'],
+        'project_2' : ['test_workspace/project_1.yaml'],
+    },
+    'workspaces': {
+        'workspace_1': {
+            'projects': ['project_2'],
+        },
     },
     'settings' : {
         'export_dir': ['not_generated_projects']
@@ -53,7 +60,94 @@ class TestGenerator(TestCase):
     def tearDown(self):
         # remove created directory
         shutil.rmtree('test_workspace', ignore_errors=True)
+        shutil.rmtree('not_generated_projects', ignore_errors=True)
 
     def test_settings(self):
         # only check things which are affected by projects.yaml
         assert self.workspace.settings.export_location_format == 'not_generated_projects'
+
+    def test_shared_records(self):
+        projects = list(self.workspace.generate())[:2]
+        # one record shared by both projects and the workspace member is parsed once
+        assert self.workspace.record_cache.misses + self.workspace.record_cache.hits == 1
+        assert self.workspace.record_cache.memo_hits == 2
+        projects[0].project['common']['sources'].append('sources/other.cpp')
+        assert projects[1].project['common']['sources'] == project_1_yaml['common']['sources']
+
+    def test_index(self):
+        index = Generator(dict(projects_yaml, projects={'project_3': [['test_workspace/missing.yaml']]})).index
+        # records are not loaded, missing file is not an error
+        assert index.projects == ['project_3']
+        assert index.records('project_3') == ['test_workspace/missing.yaml']
+
+        index = self.workspace.index
+        assert index.projects == ['project_1', 'project_2']
+        assert index.workspaces == ['workspace_1']
+        assert index.workspaces_of('project_2') == ['workspace_1']
+        assert index.workspaces_of('project_1') == []
+        assert self.workspace.record_cache.misses == 0
+
+    def test_shard(self):
+        index = self.workspace.index
+        shards = [index.shard((i, 3)) for i in range(1, 4)]
+        # each project and workspace is in exactly one shard
+        assert sorted(shards[0] | shards[1] | shards[2]) == ['project_1', 'project_2', 'workspace_1']
+        assert sum([len(shard) for shard in shards]) == 3
+        assert index.shard((1, 3)) == shards[0]
+
+        # the most expensive is alone, the workspace costs as much as project_2
+        shards = [index.shard((i, 2), {'project_1': 10, 'project_2': 4}) for i in range(1, 3)]
+        assert shards == [set(['project_1']), set(['project_2', 'workspace_1'])]
+
+        names = [project.name for project in self.workspace.generate(shard=(1, 2))]
+        assert set(names) == index.shard((1, 2))
+
+        # costs are read from a file shared by all shards
+        with open('test_workspace/costs.yaml', 'wt') as f:
+            f.write(yaml.dump({'project_1': 10, 'project_2': 4}, default_flow_style=False))
+        costs = self.workspace.shard_costs('test_workspace/costs.yaml')
+        assert costs == {'project_1': 10.0, 'project_2': 4.0}
+        assert self.workspace.shard_costs() == {}
+        names = [project.name for project in self.workspace.generate(shard=(1, 2), costs=costs)]
+        assert names == ['project_1']
+
+    def test_export_many(self):
+        results = self.workspace.export_many(['project_1', 'project_4'], ['arm_none_eabi_gdb'])
+        assert [(result.name, result.tool) for result in results] == [('project_4', None),
+            ('project_1', 'arm_none_eabi_gdb')]
+        assert results[0].failed and results[0].error
+        assert not results[1].failed and results[1].time >= 0
+
+        # no target defined, the exception fails the project only
+        results = self.workspace.export_many(tools=['make_gcc_arm'])
+        assert [(result.name, result.workspace) for result in results] == [('project_1', False),
+            ('project_2', False), ('workspace_1', True)]
+        assert results[0].failed and results[0].error
+
+    def test_export_many_scans(self):
+        # a project is loaded and scanned once for all of its tools
+        os.makedirs('test_workspace/sources')
+        with open(os.path.join(os.getcwd(), 'test_workspace/sources/main.cpp'), 'wt') as f:
+            pass
+        with open(os.path.join(os.getcwd(), 'test_workspace/scanned.yaml'), 'wt') as f:
+            f.write(yaml.dump({'common': {'sources': ['test_workspace/sources'], 'target': ['mbed-lpc1768'],
+                'tools_supported': ['make_gcc_arm', 'make_armcc']}}, default_flow_style=False))
+        generator = Generator(dict(projects_yaml, projects={'project_1': ['test_workspace/scanned.yaml']},
+            workspaces={}))
+        scans = []
+        scan = Project._set_internal_common_data
+        def counted(project):
+            scans.append(project.name)
+            return scan(project)
+        Project._set_internal_common_data = counted
+        try:
+            results = generator.export_many()
+            assert [(result.name, result.tool) for result in results] == [('project_1', 'make_gcc_arm'),
+                ('project_1', 'make_armcc')]
+            assert not any([result.failed for result in results])
+            assert scans == ['project_1']
+            scans = []
+            generator.export_many(tools=['make_gcc_arm', 'make_armcc'])
+            assert scans == ['project_1']
+        finally:
+            Project._set_internal_common_data = scan
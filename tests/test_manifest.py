@@ -0,0 +1,84 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+
+from unittest import TestCase
+
+from project_generator.manifest import Manifest, input_digest
+from project_generator.settings import ProjectSettings
+from project_generator.tools.tool import get_tool_template
+
+class TestManifest(TestCase):
+
+    """test things related to the Manifest class"""
+
+    def setUp(self):
+        if not os.path.exists('test_workspace'):
+            os.makedirs('test_workspace')
+        self.cache_dir = os.path.join('test_workspace', 'cache')
+        self.settings = ProjectSettings()
+        self.output = os.path.join('test_workspace', 'project_1.uvproj')
+        with open(self.output, 'wt') as f:
+            f.write('')
+        self.files = {'path': 'test_workspace', 'files': {'uvproj': self.output}}
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_digest(self):
+        data = get_tool_template()
+        data['source_files_c'] = {'a': ['a.c'], 'b': ['b.c']}
+        reordered = get_tool_template()
+        reordered['source_files_c'] = {'b': ['b.c'], 'a': ['a.c']}
+        digest = input_digest(data, 'uvision', self.settings)
+        assert digest == input_digest(reordered, 'uvision', self.settings)
+        assert digest != input_digest(data, 'iar_arm', self.settings)
+        data['macros'] = ['MACRO1']
+        assert digest != input_digest(data, 'uvision', self.settings)
+
+    def test_digest_fields(self):
+        data = get_tool_template()
+        data['name'] = 'project_1'
+        data.set_lazy(['source_files_c'], lambda data: data.__setitem__('source_files_c', {'a': ['a.c']}))
+        digest = input_digest(data, 'gdb', self.settings, ['name', 'output_dir'])
+        # fields which were not used are not resolved and don't change the digest
+        assert not data.is_loaded('source_files_c')
+        data['macros'] = ['MACRO1']
+        assert digest == input_digest(data, 'gdb', self.settings, ['name', 'output_dir'])
+        assert digest != input_digest(data, 'gdb', self.settings, ['name', 'output_dir', 'source_files_c'])
+        assert data.is_loaded('source_files_c')
+
+    def test_check(self):
+        manifest = Manifest(self.cache_dir)
+        assert manifest.check('project_1', 'uvision', '1') is None
+        manifest.update('project_1', 'uvision', '1', self.files, 10)
+        manifest.save()
+
+        manifest = Manifest(self.cache_dir)
+        assert manifest.check('project_1', 'uvision', '1') == self.files
+        assert manifest.check('project_1', 'uvision', '2') is None
+        os.remove(self.output)
+        assert manifest.check('project_1', 'uvision', '1') is None
+        assert manifest.summary() == (1, 2, {'inputs unchanged': 1, 'inputs changed': 1,
+            'generated files missing': 1})
+
+    def test_force(self):
+        manifest = Manifest(self.cache_dir)
+        manifest.update('project_1', 'uvision', '1', self.files)
+        manifest.save()
+        manifest = Manifest(self.cache_dir, True)
+        assert manifest.check('project_1', 'uvision', '1') is None
+        assert manifest.report == [('project_1', 'uvision', True, 'forced')]
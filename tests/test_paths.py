@@ -0,0 +1,102 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import pickle
+
+from unittest import TestCase
+
+from project_generator.paths import PathTable, PathView, PathStream, chain_paths
+
+class TestPathTable(TestCase):
+
+    """test things related to the PathTable class"""
+
+    def setUp(self):
+        self.table = PathTable()
+        self.paths = ['../../src/hal/uart.c', '../../src/hal/gpio.c', 'main.c', '..\\src\\app\\app.c']
+
+    def test_add(self):
+        ids = [self.table.add(path) for path in self.paths]
+        assert [self.table.path(file_id) for file_id in ids] == self.paths
+        # directories are stored once, a path added again has the same id
+        assert self.table.dirs == ['../../src/hal/', '', '..\\src\\app\\']
+        assert self.table.add('../../src/hal/gpio.c') == ids[1]
+        assert len(self.table) == 4
+        # names in different directories are stored once
+        assert self.table.path(self.table.add('app/main.c')) == 'app/main.c'
+        assert self.table.file_names[-1] == self.table.file_names[ids[2]]
+        assert self.table.names == ['uart.c', 'gpio.c', 'main.c', 'app.c']
+        self.table.seal()
+        # sealed names are one string
+        assert self.table.names == [] and self.table._text == 'uart.cgpio.cmain.capp.c'
+        assert [self.table.path(file_id) for file_id in ids] == self.paths
+        assert self.table.add('main.c') == 5
+        assert self.table.path(5) == 'main.c' and self.table.path(4) == 'app/main.c'
+
+    def test_view(self):
+        view = self.table.view(self.paths)
+        assert isinstance(view, PathView)
+        assert view == self.paths and view == tuple(self.paths) and self.paths == view
+        assert view[1] == '../../src/hal/gpio.c' and view[1:] == self.paths[1:]
+        assert len(view) == 4 and list(view) == self.paths
+        assert view != self.paths[1:]
+        assert copy.deepcopy(view) == self.paths
+        assert pickle.loads(pickle.dumps(view, pickle.HIGHEST_PROTOCOL)) == self.paths
+
+    def test_list_operations(self):
+        view = self.table.view(self.paths)
+        copied = view.copy()
+        assert view + ['b.c'] == self.paths + ['b.c'] and ['b.c'] + view == ['b.c'] + self.paths
+        # a modified view has its own paths, the table and the copy are not changed
+        view.append('b.c')
+        view.extend(['a.c'])
+        view.sort(key=len)
+        assert view == sorted(self.paths + ['b.c', 'a.c'], key=len)
+        view.remove('main.c')
+        assert view.pop() == '../../src/hal/gpio.c'
+        view[0] = 'c.c'
+        del view[1]
+        view.insert(0, 'd.c')
+        view += view
+        assert view == ['d.c', 'c.c', '..\\src\\app\\app.c', '../../src/hal/uart.c'] * 2
+        assert copied == self.paths and len(self.table) == 4
+        assert pickle.loads(pickle.dumps(view, pickle.HIGHEST_PROTOCOL)) == view
+
+class TestPathStream(TestCase):
+
+    """test things related to the PathStream class"""
+
+    def setUp(self):
+        self.produced = 0
+        self.stream = PathStream(self.produce, ['main.c', 'uart.c'])
+
+    def produce(self, paths):
+        self.produced += 1
+        for path in paths:
+            yield path
+
+    def test_iterate(self):
+        # paths are produced for each iteration, they are not stored
+        assert list(self.stream) == ['main.c', 'uart.c'] and list(self.stream) == ['main.c', 'uart.c']
+        assert self.produced == 2
+        assert self.stream.count() == 2 and self.stream and not PathStream(iter, [])
+        assert list(self.stream.map(lambda path: 'src/' + path)) == ['src/main.c', 'src/uart.c']
+        # a pickled stream is a list
+        assert pickle.loads(pickle.dumps(self.stream, pickle.HIGHEST_PROTOCOL)) == ['main.c', 'uart.c']
+
+    def test_chain_paths(self):
+        assert chain_paths([['a.c'], ('b.c',)]) == ['a.c', 'b.c']
+        chained = chain_paths([['a.c'], self.stream])
+        assert isinstance(chained, PathStream) and list(chained) == ['a.c', 'main.c', 'uart.c']
@@ -0,0 +1,79 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+
+from unittest import TestCase
+
+from project_generator.fs import FileSystemSnapshot
+from project_generator.patterns import compile_pattern, is_pattern, glob, expand, PathMatcher
+
+files = [
+    'src/main.c',
+    'src/main.h',
+    'src/hal/hal.c',
+    'src/hal/hal_win32.c',
+    'src/hal/test/test_hal.c',
+    'src/vendor/lib/lib.c',
+]
+
+class TestPatterns(TestCase):
+
+    """test glob patterns in sources and includes"""
+
+    def setUp(self):
+        for path in files:
+            path = os.path.join('test_workspace', path)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wt') as f:
+                pass
+        self.fs = FileSystemSnapshot()
+
+    def tearDown(self):
+        # remove created directory
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_compile(self):
+        assert compile_pattern('src/*.c').match('src/main.c')
+        assert not compile_pattern('src/*.c').match('src/hal/hal.c')
+        assert compile_pattern('src/**').match('src/hal/hal.c')
+        assert compile_pattern('**/test/**').match('src/hal/test/test_hal.c')
+        assert compile_pattern('**/*_win32.c').match('hal_win32.c')
+        assert compile_pattern('src/ma?n.[ch]').match('src/main.h')
+        assert not compile_pattern('src/main.[!ch]').match('src/main.c')
+        assert compile_pattern('src/*.c') is compile_pattern('src/*.c')
+        assert is_pattern('!src/main.c') and is_pattern('src/*') and not is_pattern('src/main.c')
+
+    def test_glob(self):
+        assert glob('test_workspace/src/*.c', self.fs) == ['test_workspace/src/main.c']
+        # only src is listed
+        assert self.fs.listings == 1
+        assert glob('test_workspace/**/*.c', self.fs) == sorted(['test_workspace/' + path
+            for path in files if path.endswith('.c')])
+
+    def test_prune(self):
+        matcher = PathMatcher(['!**/test/**', '!test_workspace/src/vendor/**', '!**/*_win32.c'])
+        assert glob('test_workspace/src/**', self.fs, matcher) == ['test_workspace/src/hal/hal.c',
+            'test_workspace/src/main.c', 'test_workspace/src/main.h']
+        # excluded directories are not listed
+        assert self.fs.listings == 2
+
+    def test_expand(self):
+        matcher = PathMatcher(['!**/hal/**'])
+        entries = ['test_workspace/src/main.c', 'test_workspace/src/hal/hal.c', '!**/hal/**',
+            'test_workspace/src/**/*.h', 'test_workspace/src/*']
+        # plain entries are kept as they are, excluded dropped, patterns matched with extensions
+        assert expand(entries, self.fs, matcher, ['h']) == ['test_workspace/src/main.c',
+            os.path.normpath('test_workspace/src/main.h'), os.path.normpath('test_workspace/src/main.h')]
@@ -20,7 +20,8 @@ from unittest import TestCase
 from project_generator.project import Project
 from project_generator.generate import Generator
 from project_generator.settings import ProjectSettings
-from project_generator.util import merge_recursive
+from project_generator.util import merge_recursive, SOURCE_KEYS
+from project_generator.paths import PathStream
 
 project_1_yaml = {
     'common': {
@@ -166,6 +167,7 @@ class TestProjectDict(TestCase):
     def tearDown(self):
         # remove created directory
         shutil.rmtree('test_workspace', ignore_errors=True)
+        shutil.rmtree('generated_projects', ignore_errors=True)
 
     def test_name(self):
         assert self.project.name == 'project_1'
@@ -198,3 +200,123 @@ class TestProjectDict(TestCase):
         self.project._fill_export_dict('uvision')
         # we use default one in this class
         assert self.project.project['export']['output_dir']['path'] == os.path.join('generated_projects', 'uvision_project_1')
+
+    def test_tool_overlay(self):
+        project = Project('project_1', [project_1_yaml, project_2_yaml, {'tool_specific': {'uvision': {
+            'macros': ['UVISION_MACRO'], 'sources': ['test_workspace/file4.c']}}}], ProjectSettings())
+        project._fill_export_dict('uvision')
+        assert 'UVISION_MACRO' in project.project['export']['macros']
+        assert project.project['export']['source_files_c'] == {'default': (os.path.normpath('../../test_workspace/file4.c'),)}
+        scan = project._common_scan
+
+        # common data are scanned once, other tools don't get uvision data
+        project._fill_export_dict('iar_arm')
+        assert project._common_scan is scan
+        assert 'UVISION_MACRO' not in project.project['export']['macros']
+        assert 'UVISION_MACRO' not in project.project['common']['macros']
+        assert project.project['export']['source_files_c'] == dict()
+        assert sorted(project.project['export']['source_files_cpp'].keys()) == ['sources_dict', 'sources_dict2']
+
+    def test_parallel_scan(self):
+        for name in ['a', 'b', 'c']:
+            os.makedirs(os.path.join('test_workspace', name))
+            for source in ['%s.c' % name, 'main.cpp', 'header.h']:
+                with open(os.path.join('test_workspace', name, source), 'wt') as f:
+                    pass
+        sources = {'common': {'sources': {'group': ['test_workspace/c', 'test_workspace/a'],
+            'other': ['test_workspace/b', 'test_workspace/file2.cpp']},
+            'includes': ['test_workspace/b', 'test_workspace/a', 'test_workspace/header3.h']}}
+
+        project = Project('project_1', [sources], ProjectSettings())
+        project._fill_export_dict('uvision')
+        settings = ProjectSettings()
+        settings.scan_jobs = 4
+        parallel = Project('project_1', [sources], settings)
+        parallel._fill_export_dict('uvision')
+        assert parallel.project['export'] == project.project['export']
+        assert parallel.fs.listings == project.fs.listings
+
+    def test_source_patterns(self):
+        for path in ['src/main.c', 'src/hal/hal.c', 'src/hal/hal_win32.c', 'src/hal/test/test.c', 'src/inc/hal.h']:
+            path = os.path.join('test_workspace', path)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wt') as f:
+                pass
+        project = Project('project_1', [{'common': {
+            'sources': {'hal': ['test_workspace/src/**', '!**/test/**'], 'app': ['!**/*_win32.c']},
+            'includes': ['test_workspace/src/**/*.h', '!**/test/**']}}], ProjectSettings())
+        project._fill_export_dict('uvision')
+        assert project.project['export']['source_files_c'] == {'hal': tuple([os.path.normpath(os.path.join('..', '..', path))
+            for path in ['test_workspace/src/hal/hal.c', 'test_workspace/src/main.c']])}
+        assert project.project['export']['include_paths'] == [os.path.normpath('../../test_workspace/src/inc')]
+        # src, hal and inc, the excluded directory is not listed
+        assert project.fs.listings == 3
+
+    def test_listed_file_names(self):
+        # names of listed files are not patterns
+        os.makedirs('test_workspace/src')
+        for name in ['foo[1].c', 'bar[a-z].c']:
+            with open(os.path.join('test_workspace/src', name), 'wt') as f:
+                pass
+        project = Project('project_1', [{'common': {'sources': ['test_workspace/src']}}], ProjectSettings())
+        project._fill_export_dict('uvision')
+        assert sorted(project.project['export']['source_files_c']['default']) == sorted([
+            os.path.normpath(os.path.join('..', '..', 'test_workspace/src', name)) for name in ['foo[1].c', 'bar[a-z].c']])
+
+    def test_duplicate_paths(self):
+        # a file or directory listed again is added once, in the first position
+        project = Project('project_1', [{'common': {
+            'sources': ['test_workspace/file3.cpp', 'test_workspace', 'test_workspace/main.cpp'],
+            'includes': ['test_workspace/header2.h', 'test_workspace', 'test_workspace/header2.h']}}],
+            ProjectSettings())
+        project._fill_export_dict('uvision')
+        export = project.project['export']
+        assert export['source_paths'] == [os.path.normpath('../../test_workspace')]
+        assert export['include_paths'] == [os.path.normpath('../../test_workspace')]
+        assert sorted(export['source_files_cpp']['default']) == sorted([os.path.normpath(os.path.join('..', '..',
+            'test_workspace', name)) for name in ['main.cpp', 'file2.cpp', 'file3.cpp']])
+        assert export['include_files']['default'][0] == os.path.normpath('../../test_workspace/header2.h')
+        assert len(export['include_files']['default']) == 3
+
+    def test_stream_sources(self):
+        settings = ProjectSettings()
+        settings.stream_sources = True
+        records = [project_1_yaml, project_2_yaml,
+            {'common': {'sources': {'dir': ['test_workspace', 'test_workspace/main.cpp', '!test_workspace/file2.cpp']}}}]
+        streamed = Project('project_1', records, settings)
+        streamed._fill_export_dict('make_gcc_arm')
+        project = Project('project_1', records, ProjectSettings())
+        project._fill_export_dict('make_gcc_arm')
+        export, expected = streamed.project['export'], project.project['export']
+        assert isinstance(export['source_files_cpp']['dir'], PathStream)
+        for key in SOURCE_KEYS:
+            for group, files in expected[key].items():
+                assert sorted(export[key][group]) == sorted(files)
+        assert list(export['source_files_cpp']['dir']) == list(expected['source_files_cpp']['dir'])
+        assert not export['source_files_c']['dir']
+        assert export['source_paths'] == expected['source_paths']
+        assert export['include_files'] == expected['include_files']
+        # files are listed when they are iterated, changed files fail the export
+        with open(os.path.join(os.getcwd(), 'test_workspace/file4.cpp'), 'wt') as f:
+            pass
+        with self.assertRaises(RuntimeError):
+            list(export['source_files_cpp']['dir'])
+        streamed._release_digests()
+        assert [os.path.basename(path) for path in export['file_groups']['dir']] == ['file3.cpp', 'file4.cpp', 'main.cpp']
+
+    def test_lazy_sources(self):
+        # gdb startup files don't need sources, directories are not scanned
+        self.project.generate('arm_none_eabi_gdb')
+        assert not self.project.project['export'].is_loaded('source_files_cpp')
+        assert self.project.fs.listings == 0 and self.project._common_scan is None
+        assert os.path.isfile(os.path.join('generated_projects', 'arm_none_eabi_gdb_project_1', 'project_1.gdbstartup'))
+        self.project._fill_export_dict('uvision')
+        lazy = self.project.project['export']
+        # the loader resolves data for its tool, the project might be on another one now
+        self.project._fill_export_dict('iar_arm')
+        project = Project('project_1', [project_1_yaml, project_2_yaml], ProjectSettings())
+        project._fill_export_dict('uvision')
+        assert dict(lazy) == dict(project.project['export'])
+        assert lazy['source_files_cpp'] and self.project.project['export']['output_dir']['path'].startswith(
+            os.path.join('generated_projects', 'iar_arm'))
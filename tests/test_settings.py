@@ -30,6 +30,11 @@ settings_dict = {
     },
     'definitions_dir': ['path_to_definitions'],
     'export_dir': ['path_to_export'],
+    'record_jobs': [4],
+    'scan_jobs': [8],
+    'fs_index': [True],
+    'stream_sources': [True],
+    'template_cache': [True],
 }
 
 class TestProject(TestCase):
@@ -45,3 +50,8 @@ class TestProject(TestCase):
         assert self.settings.get_env_settings('iar') == settings_dict['tools']['iar']['path'][0]
         assert self.settings.get_env_settings('uvision') == settings_dict['tools']['uvision']['path'][0]
         assert self.settings.export_location_format == settings_dict['export_dir'][0]
+        assert self.settings.record_jobs == 4
+        assert self.settings.scan_jobs == 8
+        assert self.settings.fs_index
+        assert self.settings.stream_sources
+        assert self.settings.template_cache
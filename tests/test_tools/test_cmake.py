@@ -53,3 +53,12 @@ class TestProject(TestCase):
 
         assert result == 0
         assert projectfiles
+
+    def test_export_data_not_modified(self):
+        # cmake sets rel_path for its makefile data, other exporters must not see it
+        self.project._fill_export_dict('cmake_gcc_arm')
+        export = self.project.project['export']
+        rel_path = export['output_dir']['rel_path']
+        CMakeGccArm(export.view(), ProjectSettings()).export_project()
+        assert rel_path and export['output_dir']['rel_path'] == rel_path
+        assert 'core' not in export
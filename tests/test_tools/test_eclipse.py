@@ -53,3 +53,24 @@ class TestProject(TestCase):
 
         assert result == 0
         assert projectfiles
+
+    def test_export_project_order(self):
+        # files of a group are sorted by their names, case insensitive, names which
+        # differ only in case keep their order
+        os.makedirs('test_workspace/order')
+        for name in ['b.c', 'Uart.c', 'uart.c', 'a.h', 'A.cpp']:
+            open(os.path.join('test_workspace/order', name), 'w').close()
+        project = Project('order', [{'common': {
+            'sources': {'drivers': ['test_workspace/order/b.c', 'test_workspace/order/Uart.c',
+                'test_workspace/order/uart.c', 'test_workspace/order/A.cpp']},
+            'includes': {'drivers': ['test_workspace/order/a.h']},
+            'target': ['mbed-lpc1768'],
+            'linker_file': ['linker_script'],
+            }}], ProjectSettings())
+        assert project.generate('eclipse_make_gcc_arm', False) == 0
+        files = project.get_generated_project_files('eclipse_make_gcc_arm')
+        with open([f for f in files['files'] if f.endswith('.project')][0]) as f:
+            names = [line.strip()[len('<name>drivers/'):-len('</name>')] for line in f
+                if line.strip().startswith('<name>drivers/')]
+        # the template lists include_files again, they are not expanded there
+        assert [name for name in names if name] == ['A.cpp', 'a.h', 'b.c', 'Uart.c', 'uart.c']
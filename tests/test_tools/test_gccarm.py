@@ -53,3 +53,13 @@ class TestProject(TestCase):
 
         assert result == 0
         assert projectfiles
+
+    def test_export_project_stream(self):
+        # makefiles take streamed sources as they are
+        self.project.settings.stream_sources = True
+        result = self.project.generate('make_gcc_arm', False)
+        projectfiles = self.project.get_generated_project_files('make_gcc_arm')
+
+        assert result == 0
+        with open(os.path.join(projectfiles['path'], 'Makefile')) as f:
+            assert 'gcc_arm.cpp' in f.read()
@@ -0,0 +1,123 @@
+# Copyright 2015 0xc0170
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import shutil
+
+from unittest import TestCase
+
+from project_generator.settings import ProjectSettings
+from project_generator.tools.tool import Exporter, get_environment, compile_templates, COMPILED_INDEX
+from project_generator.tools.gdb import ARMNoneEABIGDB
+
+class TestEnvironment(TestCase):
+
+    """test things related to the shared jinja2 environment"""
+
+    def setUp(self):
+        if not os.path.exists('test_workspace'):
+            os.makedirs('test_workspace')
+        self.settings = ProjectSettings()
+        self.settings.cache_dir = os.path.join('test_workspace', 'cache')
+
+    def tearDown(self):
+        shutil.rmtree('test_workspace', ignore_errors=True)
+
+    def test_shared(self):
+        env = get_environment(Exporter.TEMPLATE_DIR)
+        assert get_environment(Exporter.TEMPLATE_DIR) is env
+        # templates are compiled once
+        assert env.get_template('gdb.tmpl') is env.get_template('gdb.tmpl')
+        assert ARMNoneEABIGDB(None, self.settings)._get_environment() is \
+            get_environment(Exporter.TEMPLATE_DIR, None, Exporter.COMPILED_TEMPLATE_DIR)
+
+    def test_bytecode_cache(self):
+        self.settings.template_cache = True
+        exporter = ARMNoneEABIGDB(None, self.settings)
+        exporter.gen_file_jinja('gdb.tmpl', {'gdb_server_port': 3333}, 'project.gdbstartup', 'test_workspace')
+        assert os.listdir(os.path.join('test_workspace', 'cache', 'templates'))
+        with open(os.path.join('test_workspace', 'project.gdbstartup')) as f:
+            assert '3333' in f.read()
+        # the cache is off with other caches
+        self.settings.cache = False
+        assert exporter._get_environment() is \
+            get_environment(Exporter.TEMPLATE_DIR, None, Exporter.COMPILED_TEMPLATE_DIR)
+
+    def test_compiled(self):
+        compiled_dir = os.path.join('test_workspace', 'compiled')
+        os.makedirs(compiled_dir)
+        assert 'eclipse_makefile.cproject.tmpl' in compile_templates(Exporter.TEMPLATE_DIR, compiled_dir)
+        env = get_environment(Exporter.TEMPLATE_DIR, compiled_dir=compiled_dir)
+        template = env.get_template('gdb.tmpl')
+        assert template.filename.startswith(os.path.abspath(compiled_dir))
+        assert template.render(gdb_server_port=3333) == \
+            get_environment(Exporter.TEMPLATE_DIR).get_template('gdb.tmpl').render(gdb_server_port=3333)
+        # a template which changed since it was compiled comes from its source
+        with open(os.path.join(compiled_dir, COMPILED_INDEX)) as f:
+            index = json.load(f)
+        index['templates']['makefile_gcc.tmpl'] = 'outdated'
+        with open(os.path.join(compiled_dir, COMPILED_INDEX), 'w') as f:
+            json.dump(index, f)
+        # the index is read by a new environment
+        env = get_environment(Exporter.TEMPLATE_DIR, os.path.join('test_workspace', 'cache'), compiled_dir)
+        assert env.get_template('makefile_gcc.tmpl').filename == os.path.join(Exporter.TEMPLATE_DIR, 'makefile_gcc.tmpl')
+        assert env.get_template('gdb.tmpl').filename.startswith(os.path.abspath(compiled_dir))
+
+        # templates compiled by another jinja2 are not used
+        index['jinja2'] = '0.1'
+        with open(os.path.join(compiled_dir, COMPILED_INDEX), 'w') as f:
+            json.dump(index, f)
+        env = get_environment(Exporter.TEMPLATE_DIR, compiled_dir=compiled_dir + os.sep)
+        assert env.get_template('gdb.tmpl').filename == os.path.join(Exporter.TEMPLATE_DIR, 'gdb.tmpl')
+
+    def test_compiled_edited(self):
+        # a template edited after it was loaded is not served from its compiled module
+        template_dir = os.path.join('test_workspace', 'templates')
+        compiled_dir = os.path.join('test_workspace', 'compiled')
+        os.makedirs(template_dir)
+        os.makedirs(compiled_dir)
+        with open(os.path.join(template_dir, 'port.tmpl'), 'w') as f:
+            f.write('port {{ port }}')
+        compile_templates(template_dir, compiled_dir)
+        env = get_environment(template_dir, compiled_dir=compiled_dir)
+        assert env.get_template('port.tmpl').render(port=1) == 'port 1'
+        assert env.get_template('port.tmpl').filename.startswith(os.path.abspath(compiled_dir))
+
+        stat = os.stat(os.path.join(template_dir, 'port.tmpl'))
+        with open(os.path.join(template_dir, 'port.tmpl'), 'w') as f:
+            f.write('server port {{ port }}')
+        os.utime(os.path.join(template_dir, 'port.tmpl'), (stat.st_atime, stat.st_mtime + 2))
+        assert env.get_template('port.tmpl').render(port=1) == 'server port 1'
+
+    def test_gen_file_jinja(self):
+        # the output is streamed to the file, it's the same as rendered
+        data = {'name': 'project', 'source_files_c': ['main.c', 'uart.c'] * 300, 'include_paths': ['include'],
+            'source_paths': ['src'], 'misc': {}}
+        exporter = ARMNoneEABIGDB(None, self.settings)
+        path, output = exporter.gen_file_jinja('makefile_gcc.tmpl', data, 'Makefile', 'test_workspace')
+        assert output == os.path.join('test_workspace', 'Makefile')
+        with open(output) as f:
+            assert f.read() == exporter._get_environment().get_template('makefile_gcc.tmpl').render(data)
+
+        # an error while rendering keeps the previous output
+        def failing():
+            for source in data['source_files_c']:
+                yield source
+            raise RuntimeError('render failed')
+        with self.assertRaises(RuntimeError):
+            exporter.gen_file_jinja('makefile_gcc.tmpl', dict(data, source_files_c=failing()), 'Makefile', 'test_workspace')
+        with open(output) as f:
+            assert f.read() == exporter._get_environment().get_template('makefile_gcc.tmpl').render(data)
+        assert [name for name in os.listdir('test_workspace') if name.endswith('.tmp')] == []
@@ -11,6 +11,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+import yaml
+import shutil
+
 from project_generator.util import *
 
 def test_flatten():
@@ -22,3 +26,57 @@ def test_flatten():
 def test_uniqify():
     l1 = ['a', 'b', 'b', 'c', 'b', 'd', 'c', 'e', 'f', 'a']
     assert uniqify(l1) == ['a', 'b', 'c', 'd', 'e', 'f']
+
+def test_ordered_set():
+    paths = OrderedSet(['b', 'a'])
+    paths.add('b')
+    paths.update(['c', 'a', 'd'])
+    assert list(paths) == ['b', 'a', 'c', 'd']
+    assert 'c' in paths and 'e' not in paths
+    assert len(paths) == 4
+
+def test_file_groups():
+    data = {'source_files_c': {'hal': ['b/Uart.c', 'a/gpio.c'], None: ['main.c']}, 'source_files_cpp': {'hal': ['spi.cpp']},
+        'source_files_s': {}, 'source_files_lib': {}, 'source_files_obj': {}, 'include_files': {'hal': ['a/UART.h'], None: ['config.h']}}
+    groups = get_file_groups(data)
+    # files without a group stay in the group None
+    assert list(groups.keys()) == [None, 'hal']
+    assert groups[None] == ['config.h', 'main.c']
+    # the same names keep the order of the keys, sources before includes
+    assert groups['hal'] == ['a/gpio.c', 'spi.cpp', 'b/Uart.c', 'a/UART.h']
+    assert sorted(['b.c', 'a.c', 'A.c'], key=file_sort_key) == ['a.c', 'A.c', 'b.c']
+
+def test_yaml_backend():
+    assert YAML_BACKEND in ['libyaml', 'python']
+
+def test_yaml_round_trip():
+    data = {'common': {'sources': ['main.cpp'], 'macros': ['MACRO1', None]}}
+    assert load_yaml(dump_yaml(data, default_flow_style=False)) == data
+
+def test_yaml_safe_load():
+    try:
+        load_yaml('!!python/object/apply:os.getcwd []')
+    except yaml.YAMLError:
+        pass
+    else:
+        assert False, "python objects must not be constructed"
+
+def test_load_yaml_records_jobs():
+    if not os.path.exists('test_workspace'):
+        os.makedirs('test_workspace')
+    try:
+        records = []
+        for i in range(8):
+            records.append(os.path.join('test_workspace', 'record_%d.yaml' % i))
+            with open(records[-1], 'wt') as f:
+                f.write(dump_yaml({'common': {'macros': ['MACRO%d' % i]}}))
+        # order of records matters as they are merged in this order
+        assert load_yaml_records(records, jobs=4) == load_yaml_records(records)
+        try:
+            load_yaml_records(records + [os.path.join('test_workspace', 'missing.yaml')], jobs=4)
+        except IOError as e:
+            assert 'missing.yaml' in str(e)
+        else:
+            assert False, "missing record must raise IOError"
+    finally:
+        shutil.rmtree('test_workspace', ignore_errors=True)